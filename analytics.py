@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Summary tables and prepared queries on top of the database, for the queries of
+the project report: top postcodes, cities, amenities, and contributing users,
+and the count of tags by type (e.g. tiger) and of elements.
+
+The summary tables hold the counts of the report queries and are updated by
+database.py in the same transaction as every load, so they stay up to date on
+incremental loads. Every report query is answered from a covering index of a
+summary table instead of a UNION over nodes_tags, ways_tags, and relations_tags.
+The queries are fixed sql strings with parameters, so sqlite3 prepares them once
+per connection and reuses them from its statement cache.
+
+Example:
+    python analytics.py --db burlesonsample.db
+"""
+
+import argparse
+import sqlite3
+import funcvar
+
+# Tag values counted in summary_tag_values, as (type, key)
+SUMMARY_KEYS = [('addr', 'postcode'),
+                ('addr', 'city'),
+                ('addr', 'street'),
+                ('regular', 'amenity'),
+                ('regular', 'shop'),
+                ('regular', 'leisure'),
+                ('regular', 'religion'),
+                ('regular', 'cuisine')]
+
+SUMMARY_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS summary_keys (
+        type TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (type, key))""",
+    """CREATE TABLE IF NOT EXISTS summary_tag_values (
+        type TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (type, key, value))""",
+    """CREATE INDEX IF NOT EXISTS summary_tag_values_count
+        ON summary_tag_values (type, key, count DESC, value)""",
+    """CREATE TABLE IF NOT EXISTS summary_tag_types (
+        type TEXT PRIMARY KEY NOT NULL,
+        count INTEGER NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS summary_users (
+        user TEXT NOT NULL,
+        uid INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (user, uid))""",
+    """CREATE INDEX IF NOT EXISTS summary_users_count
+        ON summary_users (count DESC, user, uid)""",
+    """CREATE TABLE IF NOT EXISTS summary_elements (
+        element TEXT PRIMARY KEY NOT NULL,
+        count INTEGER NOT NULL)"""]
+
+SUMMARY_TABLES = ['summary_tag_values', 'summary_tag_types', 'summary_users', 'summary_elements']
+
+
+#               Maintaining Functions
+
+def has_summaries(conn):
+    """
+    Check whether the database has all the summary tables.
+    """
+    names = ["'" + table + "'" for table in ['summary_keys'] + SUMMARY_TABLES]
+    count = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ("
+                         + ", ".join(names) + ")").fetchone()[0]
+    return count == len(names)
+
+def create_summaries(conn):
+    """
+    Create the summary tables and their indexes if they do not exist.
+    Args:
+        conn: sqlite3 connection
+    """
+    for statement in SUMMARY_SCHEMA:
+        conn.execute(statement)
+    conn.executemany("INSERT OR IGNORE INTO summary_keys (type, key) VALUES (?, ?)",
+                     SUMMARY_KEYS)
+
+def update_summaries(conn, element_sources, tag_sources, sign=1):
+    """
+    Add the counts of elements and tags to the summary tables, or subtract them.
+    Args:
+        conn: sqlite3 connection
+        element_sources: list of (element name, sql table or subquery of element rows),
+            e.g. [('node', 'nodes')]
+        tag_sources: list of sql tables or subqueries of tag rows, e.g. ['nodes_tags']
+        sign: 1 to add the counts, -1 to subtract them
+    """
+    for source in tag_sources:
+        conn.execute("""
+            INSERT INTO summary_tag_values (type, key, value, count)
+            SELECT t.type, t.key, t.value, ? * COUNT(*)
+            FROM """ + source + """ t
+            WHERE EXISTS (SELECT 1 FROM summary_keys k WHERE k.type = t.type AND k.key = t.key)
+            AND t.value IS NOT NULL
+            GROUP BY t.type, t.key, t.value
+            ON CONFLICT (type, key, value) DO UPDATE SET count = count + excluded.count""",
+                     (sign,))
+        conn.execute("""
+            INSERT INTO summary_tag_types (type, count)
+            SELECT t.type, ? * COUNT(*) FROM """ + source + """ t
+            WHERE t.type IS NOT NULL
+            GROUP BY t.type
+            ON CONFLICT (type) DO UPDATE SET count = count + excluded.count""",
+                     (sign,))
+    for element, source in element_sources:
+        conn.execute("""
+            INSERT INTO summary_users (user, uid, count)
+            SELECT COALESCE(e.user, ''), COALESCE(e.uid, -1), ? * COUNT(*)
+            FROM """ + source + """ e
+            WHERE 1
+            GROUP BY COALESCE(e.user, ''), COALESCE(e.uid, -1)
+            ON CONFLICT (user, uid) DO UPDATE SET count = count + excluded.count""",
+                     (sign,))
+        conn.execute("""
+            INSERT INTO summary_elements (element, count)
+            SELECT ?, ? * COUNT(*) FROM """ + source + """
+            WHERE 1
+            ON CONFLICT (element) DO UPDATE SET count = count + excluded.count""",
+                     (element, sign))
+
+def prune_summaries(conn):
+    """
+    Delete the summary rows that no longer count anything.
+    """
+    for table in SUMMARY_TABLES:
+        if table != 'summary_elements':
+            conn.execute("DELETE FROM " + table + " WHERE count <= 0")
+
+def rebuild_summaries(conn, element_sources, tag_sources):
+    """
+    Empty the summary tables and count all the elements and tags again, e.g. for
+    a database that was loaded before the summary tables existed.
+    Args:
+        conn: sqlite3 connection
+        element_sources: list of (element name, element table)
+        tag_sources: list of tag tables
+    """
+    create_summaries(conn)
+    for table in SUMMARY_TABLES:
+        conn.execute("DELETE FROM " + table)
+    update_summaries(conn, element_sources, tag_sources)
+
+
+#               Prepared Queries
+
+TOP_TAG_VALUES_QUERY = """
+    SELECT value, count FROM summary_tag_values
+    WHERE type = ? AND key = ?
+    ORDER BY count DESC, value
+    LIMIT ?"""
+
+TOP_USERS_QUERY = """
+    SELECT user, count FROM summary_users
+    ORDER BY count DESC, user, uid
+    LIMIT ?"""
+
+COUNT_TAGS_QUERY = "SELECT COALESCE(SUM(count), 0) FROM summary_tag_types"
+
+COUNT_TAG_TYPE_QUERY = "SELECT COALESCE(SUM(count), 0) FROM summary_tag_types WHERE type = ?"
+
+COUNT_ELEMENTS_QUERY = "SELECT element, count FROM summary_elements ORDER BY element"
+
+def top_tag_values(conn, tag_type, key, limit=10):
+    """
+    Get the most frequent values of a tag in nodes, ways, and relations. The tag
+    must be one of SUMMARY_KEYS.
+    Args:
+        conn: sqlite3 connection
+        tag_type: tag type, e.g. addr
+        key: tag key, e.g. postcode
+        limit: maximum number of values
+    Returns:
+        list of (value, count)
+    """
+    if (tag_type, key) not in SUMMARY_KEYS:
+        raise ValueError(tag_type + ':' + key + ' is not counted in the summary tables')
+    return conn.execute(TOP_TAG_VALUES_QUERY, (tag_type, key, limit)).fetchall()
+
+def top_postcodes(conn, limit=10):
+    """Get the most frequent postcodes as a list of (postcode, count)"""
+    return top_tag_values(conn, 'addr', 'postcode', limit)
+
+def top_cities(conn, limit=10):
+    """Get the most frequent cities as a list of (city, count)"""
+    return top_tag_values(conn, 'addr', 'city', limit)
+
+def top_amenities(conn, limit=10):
+    """Get the most frequent amenities as a list of (amenity, count)"""
+    return top_tag_values(conn, 'regular', 'amenity', limit)
+
+def top_users(conn, limit=10):
+    """Get the users who contributed the most nodes, ways, and relations as a list of (user, count)"""
+    return conn.execute(TOP_USERS_QUERY, (limit,)).fetchall()
+
+def count_tags(conn, tag_type=None):
+    """
+    Get the count of tags in nodes, ways, and relations.
+    Args:
+        conn: sqlite3 connection
+        tag_type: count only the tags of this type (e.g. tiger), all tags if None
+    Returns:
+        count of tags
+    """
+    if tag_type is None:
+        return conn.execute(COUNT_TAGS_QUERY).fetchone()[0]
+    return conn.execute(COUNT_TAG_TYPE_QUERY, (tag_type,)).fetchone()[0]
+
+def count_elements(conn):
+    """Get the count of node, way, and relation in a dictionary"""
+    return dict(conn.execute(COUNT_ELEMENTS_QUERY).fetchall())
+
+
+def display_report(conn, limit=10):
+    """
+    Display the report queries of the project report.
+    """
+    print ("Elements:")
+    for element, count in sorted(count_elements(conn).items()):
+        print ("    " + element + ": " + str(count))
+    print ("Tags: " + str(count_tags(conn)) + ", tiger tags: " + str(count_tags(conn, 'tiger')))
+    for title, rows in [("Top postcodes:", top_postcodes(conn, limit)),
+                        ("Top cities:", top_cities(conn, limit)),
+                        ("Top amenities:", top_amenities(conn, limit)),
+                        ("Top users:", top_users(conn, limit))]:
+        print (title)
+        for value, count in rows:
+            print ("    " + value + ": " + str(count))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=funcvar.DB_PATH,
+                        help='database file (default: %(default)s)')
+    parser.add_argument('--limit', type=int, default=10,
+                        help='number of values of the top lists (default: %(default)s)')
+    args = parser.parse_args(argv)
+    # database imports this module, connect creates and fills missing summary tables
+    import database
+    conn = database.connect(args.db)
+    display_report(conn, args.limit)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,13 @@ problem_street_types = defaultdict(set)
 problem_highways = defaultdict(set)
 problem_cities = defaultdict(set)
 problem_zipcodes = defaultdict(set)
+AUDIT_RESULT = {'problem_chars': problem_chars,
+                'problem_building_numbers': problem_building_numbers,
+                'problem_points': problem_points,
+                'problem_street_types': problem_street_types,
+                'problem_highways': problem_highways,
+                'problem_cities': problem_cities,
+                'problem_zipcodes': problem_zipcodes}
 
 def audit_char(s):
     """
@@ -108,41 +115,89 @@ def audit_street_name(s):
     audit_stret_type(s)
     audit_highway(s)
     
-def audit_city_name(c):
+def get_city_name_problems(c):
     """
-    Verify if a city name consists of problem characters, or state 
-    name (TX or Texas).
+    Get the problems of a city name: problem characters, state name (TX or 
+    Texas), or abbreviated name.
     Args:
-        z: zipcode value
+        c: city name
+    Returns:
+        list of problem names
     """
+    problems = []
     # check for city name that includes state name
     if any(x in c.lower() for x in ['tx', 'texas']):
-        problem_cities['include state'].add(c)
+        problems.append('include state')
     # check for city name that include non alphabet character
     elif not all(x.isalpha() for x in c.lower().replace(' ','')):
-        problem_cities['non-alphabet'].add(c)
+        problems.append('non-alphabet')
     # check for city with abbreviated name
-    for x in funcvar.CITY_MAPPING.keys():
-        if x.lower() in c.lower() and funcvar.CITY_MAPPING[x] not in c:
-            problem_cities['problem names'].add(c)
-			
-def audit_zipcode(z):
+    c_lower = c.lower()
+    if any(x_lower in c_lower and name not in c
+           for x_lower, x, name in funcvar.CITY_INDEX):
+        problems.append('problem names')
+    return problems
+
+def audit_city_name(c):
     """
-    Verify if a zip code contains non-digit charachters, the wrong format 
-    (not 5 digit), or a non Burleson zip code (Burleson zip codes starts with 76 ).
+    Verify if a city name consists of problem characters, or state 
+    name (TX or Texas). If it does, it will add the city name into 
+    problem_cities set.
+    Args:
+        c: city name
+    """
+    for problem in get_city_name_problems(c):
+        problem_cities[problem].add(c)
+
+def get_zipcode_problems(z):
+    """
+    Get the problems of a zip code: non-digit charachters, the wrong format 
+    (not 5 digit), or a zip code outside of the region (e.g. Burleson zip codes 
+    starts with 76, see funcvar.ZIP_PREFIXES).
     Args:
         z: zip code value
+    Returns:
+        list of problem names
     """
+    problems = []
     # Check for non-digit value
     if not all(x.isdigit() for x in z):
-        problem_zipcodes['non-digit'].add(z) 
+        problems.append('non-digit')
     # Check for non 5-digit value
     if len(z) != 5:
-        problem_zipcodes['non 5-digit'].add(z)
-    # Check for non 75 or 76
-    if not z.startswith('76'):
-        problem_zipcodes['non Burleson'].add(z)
+        problems.append('non 5-digit')
+    # Check for zip code prefixes of the region
+    if not z.startswith(funcvar.ZIP_PREFIXES):
+        problems.append('non ' + funcvar.REGION_NAME)
+    return problems
+
+def audit_zipcode(z):
+    """
+    Verify if a zip code contains non-digit charachters, the wrong format 
+    (not 5 digit), or a zip code outside of the region. If it does, it will 
+    add the zip code into problem_zipcodes set.
+    Args:
+        z: zip code value
+    """
+    for problem in get_zipcode_problems(z):
+        problem_zipcodes[problem].add(z)
 			
+def reset_audit_result():
+    """
+    Empty the problem sets so that a new file can be audited from scratch.
+    """
+    for problems in AUDIT_RESULT.values():
+        problems.clear()
+
+def get_audit_result():
+    """
+    Get a copy of the results of auditing.
+    Returns:
+        a dictionary of problem set names and their problems in a dictionary
+    """
+    return dict((name, dict((k, set(v)) for k, v in problems.items()))
+                for name, problems in AUDIT_RESULT.items())
+
 def display_audit_result():
     """
     Display the results of auditing in the osm file.
@@ -163,30 +218,42 @@ def display_audit_result():
     pprint.pprint(dict(problem_zipcodes))
        
     
-def auditing():
-    """ 
-    Audit streets, cities, and zip codes in the osm file, display the results and the time it takes
-    to audit the file
+def audit_file(osm_file):
     """
-    start = time.time()
-    print ("Auditing street names in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    Audit streets, cities, and zip codes in an osm file.
+    Args:
+        osm_file
+    Returns:
+        the results of auditing the file (see get_audit_result)
+    """
+    reset_audit_result()
+    print ("Auditing street names in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_street_name(tag):
                 name = tag.attrib['v']
                 audit_street_name(name)
-    print ("Auditing City Names in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    print ("Auditing City Names in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_city_name(tag):
                 name = tag.attrib['v']
                 audit_city_name(name)
-    print ("Auditing zip codes in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    print ("Auditing zip codes in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_zipcode(tag):
                 zipcode = tag.attrib['v']
                 audit_zipcode(zipcode)
+    return get_audit_result()
+
+def auditing(osm_file=funcvar.OSM_PATH):
+    """ 
+    Audit streets, cities, and zip codes in the osm file, display the results and the time it takes
+    to audit the file
+    """
+    start = time.time()
+    audit_file(osm_file)
     end = time.time()
     display_audit_result()
     print ("Time elapsed: " + str(end - start) + " seconds")
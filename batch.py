@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Batch versions of the street name, city name, and zip code cleaning functions
+and of the city name and zip code auditing functions, to clean and audit millions
+of values at once (e.g. values loaded from the csv files). The batch functions
+take a list, a NumPy array, or a pandas Series of strings and return the cleaned
+values or the problem masks in the same kind of container. They give the same
+results as the functions in clean.py and audit.py applied to every value.
+
+Bulk osm values repeat a lot (e.g. a few hundred zip codes and city names), so
+every distinct value is cleaned or audited only once and the result is reused
+for its repetitions. pandas is optional: with pandas the distinct values are
+found with pandas.factorize and the results are gathered with NumPy, otherwise
+with a dictionary. When a sample of the values shows that most of them are
+distinct, finding the distinct values costs more than it saves, and the values
+are cleaned or audited one by one instead. Zip codes that are mostly distinct
+are audited with the string functions of NumPy (numpy.strings, NumPy 2) over the
+whole array. Missing values (None, NaN, or pandas.NA) are returned as None and
+have no problems.
+"""
+
+import funcvar
+import audit
+import clean
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Number of values sampled to check whether most values are distinct
+DISTINCT_SAMPLE_SIZE = 10000
+# Share of distinct values in the sample above which values are processed one by one
+DISTINCT_RATIO = 0.9
+
+
+#               Container Functions
+
+def is_missing(v):
+    """Check whether a value is missing (None, NaN, or pandas.NA)"""
+    if v is None or isinstance(v, str):
+        return v is None
+    try:
+        if pd is not None:
+            return bool(pd.isna(v))
+        return bool(v != v)
+    except (TypeError, ValueError):
+        # e.g. a comparison that is not a boolean
+        return False
+
+def is_mostly_distinct(values):
+    """
+    Check on an evenly spaced sample whether most values are distinct.
+    Args:
+        values: list, NumPy array, or pandas Series of values
+    """
+    step = max(1, len(values) // DISTINCT_SAMPLE_SIZE)
+    if pd is not None and isinstance(values, pd.Series):
+        sample = values.iloc[::step]
+    else:
+        sample = values[::step]
+    sample = [v for v in sample if not is_missing(v)]
+    return len(set(sample)) > DISTINCT_RATIO * len(sample)
+
+def map_each(f, values, missing=None):
+    """
+    Apply a function to every value.
+    Args:
+        f: function of one value
+        values: list, NumPy array, or pandas Series of values
+        missing: result of the missing values
+    Returns:
+        results in the same kind of container as the values
+    """
+    # Strings are checked first, this loop is the fallback for values that are mostly distinct
+    mapped = [f(v) if isinstance(v, str) else missing if is_missing(v) else f(v) for v in values]
+    if pd is not None and isinstance(values, pd.Series):
+        return pd.Series(mapped, index=values.index, dtype=object)
+    if np is not None and isinstance(values, np.ndarray):
+        return np.array(mapped, dtype=object)
+    return mapped
+
+def map_distinct(f, values, missing=None):
+    """
+    Apply a function once to every distinct value and reuse the result for
+    its repetitions, or to every value if most values are distinct.
+    Args:
+        f: function of one value
+        values: list, NumPy array, or pandas Series of values
+        missing: result of the missing values
+    Returns:
+        results in the same kind of container as the values
+    """
+    if is_mostly_distinct(values):
+        return map_each(f, values, missing)
+    if pd is not None:
+        if isinstance(values, (pd.Series, np.ndarray)):
+            codes, uniques = pd.factorize(values)
+        else:
+            codes, uniques = pd.factorize(np.array(list(values), dtype=object))
+        # The last result is for the missing values (code -1)
+        results = np.empty(len(uniques) + 1, dtype=object)
+        results[:-1] = [f(v) for v in uniques]
+        results[-1] = missing
+        mapped = results[codes]
+        if isinstance(values, pd.Series):
+            return pd.Series(mapped, index=values.index, dtype=object)
+        if isinstance(values, np.ndarray):
+            return mapped
+        return mapped.tolist()
+    results = {}
+    mapped = []
+    for v in values:
+        if is_missing(v):
+            mapped.append(missing)
+            continue
+        if v not in results:
+            results[v] = f(v)
+        mapped.append(results[v])
+    if np is not None and isinstance(values, np.ndarray):
+        return np.array(mapped, dtype=object)
+    return mapped
+
+def get_masks(get_problems, categories, values):
+    """
+    Get the problem masks of values from a function that returns the problems
+    of one value.
+    Args:
+        get_problems: function that returns the list of problems of a value
+        categories: list of problem names
+        values: list, NumPy array, or pandas Series of values
+    Returns:
+        dictionary of problem names and their boolean masks, in the same kind of
+        container as the values
+    """
+    bits = dict((category, 1 << i) for i, category in enumerate(categories))
+    # Bit i of the code of a value is set if the value has the i-th problem
+    codes = map_distinct(lambda v: sum(bits[p] for p in get_problems(v)), values, 0)
+    if np is None:
+        return dict((category, [(c & bit) != 0 for c in codes])
+                    for category, bit in bits.items())
+    array = np.asarray(codes, dtype=int)
+    return dict((category, wrap_mask((array & bit) != 0, values))
+                for category, bit in bits.items())
+
+def wrap_mask(mask, values):
+    """
+    Put a boolean NumPy mask into the same kind of container as the values.
+    """
+    if pd is not None and isinstance(values, pd.Series):
+        return pd.Series(mask, index=values.index)
+    if isinstance(values, np.ndarray):
+        return mask
+    return mask.tolist()
+
+def get_string_array(values):
+    """
+    Convert values into a NumPy array of strings for the functions of
+    numpy.strings, with missing values as empty strings.
+    Args:
+        values: list, NumPy array, or pandas Series of strings
+    Returns:
+        array of strings and boolean mask of the missing values, or None if
+        numpy.strings would not give the same results as the str methods
+    """
+    if np is None or not hasattr(np, 'strings'):
+        return None
+    if pd is not None and isinstance(values, pd.Series):
+        items = values.to_numpy(dtype=object, copy=True)
+    else:
+        items = np.array(values, dtype=object)
+    missing = np.frompyfunc(is_missing, 1, 1)(items).astype(bool)
+    items[missing] = ''
+    # numpy.strings ignores trailing null characters (and join rejects non strings)
+    if '\0' in ''.join(items):
+        return None
+    return items.astype(np.dtypes.StringDType()), missing
+
+
+#               Street Names
+
+def clean_street_names(values):
+    """
+    Clean street names, see clean.clean_street_name.
+    Args:
+        values: list, NumPy array, or pandas Series of street names
+    Returns:
+        cleaned street names or None, in the same kind of container
+    """
+    return map_distinct(clean.clean_street_name, values)
+
+
+#               Zip Codes
+
+def get_zipcode_categories():
+    """Get the problem names of zip codes, see audit.get_zipcode_problems"""
+    return ['non-digit', 'non 5-digit', 'non ' + funcvar.REGION_NAME]
+
+def clean_zipcodes(values):
+    """
+    Clean zip code values, see clean.clean_zipcode.
+    Args:
+        values: list, NumPy array, or pandas Series of zip code values
+    Returns:
+        cleaned zip code values or None, in the same kind of container
+    """
+    return map_distinct(clean.clean_zipcode, values)
+
+def get_zipcode_masks(values):
+    """
+    Get the problems of zip code values as masks with the string functions of
+    NumPy, see audit.get_zipcode_problems.
+    Args:
+        values: list, NumPy array, or pandas Series of zip code values
+    Returns:
+        dictionary of problem names and their boolean masks, or None if
+        numpy.strings is not available or would not give the same results
+    """
+    converted = get_string_array(values)
+    if converted is None:
+        return None
+    array, missing = converted
+    length = np.strings.str_len(array)
+    in_region = np.zeros(len(array), dtype=bool)
+    for prefix in funcvar.ZIP_PREFIXES:
+        in_region |= np.strings.startswith(array, prefix)
+    # An empty value has no non-digit character
+    masks = [~(np.strings.isdigit(array) | (length == 0)), length != 5, ~in_region]
+    return dict((category, wrap_mask(mask & ~missing, values))
+                for category, mask in zip(get_zipcode_categories(), masks))
+
+def audit_zipcodes(values):
+    """
+    Get the problems of zip code values as masks, see audit.audit_zipcode.
+    Args:
+        values: list, NumPy array, or pandas Series of zip code values
+    Returns:
+        dictionary of problem names and their boolean masks
+    """
+    if is_mostly_distinct(values):
+        masks = get_zipcode_masks(values)
+        if masks is not None:
+            return masks
+    return get_masks(audit.get_zipcode_problems, get_zipcode_categories(), values)
+
+
+#               City Names
+
+def get_city_name_categories():
+    """Get the problem names of city names, see audit.get_city_name_problems"""
+    return ['include state', 'non-alphabet', 'problem names']
+
+def clean_city_names(values):
+    """
+    Clean city names, see clean.clean_city_name.
+    Args:
+        values: list, NumPy array, or pandas Series of city names
+    Returns:
+        cleaned city names or None, in the same kind of container
+    """
+    return map_distinct(clean.clean_city_name, values)
+
+def audit_city_names(values):
+    """
+    Get the problems of city names as masks, see audit.audit_city_name.
+    Args:
+        values: list, NumPy array, or pandas Series of city names
+    Returns:
+        dictionary of problem names and their boolean masks
+    """
+    return get_masks(audit.get_city_name_problems, get_city_name_categories(), values)
@@ -282,8 +282,8 @@ def clean_city_name(c):
 def clean_zipcode(z):
     """
     Clean zip code value from non-digit characters, returns None if the value is
-    not in the correct format (5 digits) or if it does not start with 76 
-    (Burleson area zip codes start with 76)
+    not in the correct format (5 digits) or if it does not match the zip codes 
+    of the region (see funcvar.zip_re, Burleson area zip codes start with 76)
     Args:
         z: zip code value
     Return:
@@ -295,35 +295,47 @@ def clean_zipcode(z):
         return zipcode
     return None
 
-def cleaning():
+def clean_file(osm_file):
     """
-    Clean streets, cities, and zip codes in the osm file then audit cleaned street names, display 
-    the result and the time it takes to clean and to audit the file
+    Clean streets, cities, and zip codes in an osm file then audit the cleaned values.
+    Args:
+        osm_file
+    Returns:
+        the results of auditing the cleaned values (see audit.get_audit_result)
     """
-    start = time.time()
-    print ("Cleaning and auditing street names in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    audit.reset_audit_result()
+    print ("Cleaning and auditing street names in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_street_name(tag):
                 name = tag.attrib['v']   
                 name = clean_street_name(name)
                 audit.audit_street_name(name)   
-    print ("Cleaning and auditing city names in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    print ("Cleaning and auditing city names in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_city_name(tag):
                 name = tag.attrib['v']
                 name = clean_city_name(name)
                 if name:
                     audit.audit_city_name(name)	
-    print ("Cleaning and auditing zip codes in " + funcvar.OSM_PATH)
-    for elem in funcvar.get_element(funcvar.OSM_PATH):
+    print ("Cleaning and auditing zip codes in " + osm_file)
+    for elem in funcvar.get_element(osm_file):
         for tag in elem.iter("tag"):
             if funcvar.is_zipcode(tag):
                 zipcode = tag.attrib['v']
                 zipcode = clean_zipcode(zipcode)
                 if zipcode:
                     audit.audit_zipcode(zipcode)
+    return audit.get_audit_result()
+
+def cleaning(osm_file=funcvar.OSM_PATH):
+    """
+    Clean streets, cities, and zip codes in the osm file then audit cleaned street names, display 
+    the result and the time it takes to clean and to audit the file
+    """
+    start = time.time()
+    clean_file(osm_file)
     end = time.time()
     audit.display_audit_result()
     print ("Time elapsed: " + str(end - start) + " seconds")
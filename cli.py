@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Command-line entry point to audit, clean, export, or get the statistics of several
+osm files at once. The osm files can be given one by one or as directories of
+regional extracts, and they are processed concurrently in a process pool. A report
+is written for every osm file, together with a summary that merges all of them.
+The reports are named after the path of the osm files relative to their common
+directory (see get_report_names), so osm files with the same name in different
+directories get their own reports, and the summary is always summary.json.
+
+Examples:
+    python cli.py audit burlesonsample.osm
+    python cli.py clean extracts/ --jobs 8 --output-dir reports
+    python cli.py export extracts/ --output-dir csv
+    python cli.py export extracts/ --output-dir csv --tag-encoding dict
+    python cli.py stats a.osm b.osm
+    python cli.py audit extracts/ --region regions/tarrant.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import funcvar
+import audit
+import clean
+import export
+import region
+
+COMMANDS = ('audit', 'clean', 'export', 'stats')
+OSM_EXTENSIONS = ('.osm', '.xml')
+SUMMARY_NAME = 'summary'
+
+
+#               Input and Output Functions
+
+def get_osm_files(paths):
+    """
+    Get the osm files from a list of files and directories. A directory is
+    replaced by the osm files it contains.
+    Args:
+        paths: list of osm files and directories
+    Returns:
+        sorted list of osm files without duplicates
+    """
+    osm_files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name.lower().endswith(OSM_EXTENSIONS):
+                    osm_files.add(os.path.join(path, name))
+        else:
+            osm_files.add(path)
+    return sorted(osm_files)
+
+def get_report_names(osm_files):
+    """
+    Get a unique report name for every osm file: its path relative to the common
+    directory of the osm files, without extension and with the directories joined
+    by dots (e.g. extracts/a/tarrant.osm and extracts/b/tarrant.osm return
+    a.tarrant and b.tarrant). A name that is already taken, or that is the name
+    of the summary, gets a numeric suffix (e.g. summary.osm returns summary.2).
+    Args:
+        osm_files: list of osm files
+    Returns:
+        dictionary of osm files and their report names
+    """
+    if not osm_files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in osm_files])
+    names = {}
+    taken = set([SUMMARY_NAME])
+    for osm_file in osm_files:
+        path = os.path.splitext(os.path.relpath(os.path.abspath(osm_file), root))[0]
+        base = '.'.join(part for part in path.split(os.sep) if part)
+        name = base
+        i = 2
+        while name in taken:
+            name = base + '.' + str(i)
+            i += 1
+        taken.add(name)
+        names[osm_file] = name
+    return names
+
+def to_json(value):
+    """
+    Convert sets into sorted lists so that a report can be written as json.
+    """
+    if isinstance(value, dict):
+        return dict((k, to_json(v)) for k, v in value.items())
+    if isinstance(value, (set, list, tuple)):
+        items = [to_json(v) for v in value]
+        return sorted(items) if isinstance(value, set) else items
+    return value
+
+def write_report(report, path):
+    """
+    Write a report as a json file.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(to_json(report), f, indent=2, sort_keys=True)
+
+
+#               Task Functions
+
+def get_stats(osm_file):
+    """
+    Get the file size, map boundaries, and element counts of an osm file.
+    """
+    return {'size': funcvar.get_file_size(osm_file),
+            'bounds': funcvar.get_map_bounds(osm_file),
+            'elements': funcvar.get_element_count(osm_file)}
+
+def run_task(command, osm_file, name, output_dir, tag_encoding=export.PLAIN_TAGS):
+    """
+    Run a command on an osm file and write the report of the file. This function
+    runs in the worker processes.
+    Args:
+        command: audit, clean, export, or stats
+        osm_file
+        name: report name of the osm file (see get_report_names), also the
+            directory of its csv files when exporting
+        output_dir: directory of the reports (and of the csv files when exporting)
+        tag_encoding: plain, or dict to dictionary-encode the exported tags
+    Returns:
+        the report of the osm file
+    """
+    start = time.time()
+    if command == 'audit':
+        report = audit.audit_file(osm_file)
+    elif command == 'clean':
+        report = clean.clean_file(osm_file)
+    elif command == 'export':
+        report = export.export_file(osm_file, os.path.join(output_dir, name), tag_encoding)
+    else:
+        report = get_stats(osm_file)
+    report = {'file': osm_file,
+              'time': round(time.time() - start, 3),
+              'result': report}
+    write_report(report, os.path.join(output_dir, name + '.json'))
+    return report
+
+
+#               Summary Functions
+
+def merge_problems(results):
+    """
+    Merge the audit results of several osm files (see audit.get_audit_result).
+    """
+    merged = {}
+    for result in results:
+        for name, problems in result.items():
+            merged.setdefault(name, {})
+            for k, v in problems.items():
+                merged[name].setdefault(k, set()).update(v)
+    return merged
+
+def merge_counts(results):
+    """
+    Merge the row counts of several exported osm files.
+    """
+    merged = {}
+    for result in results:
+        for path, count in result.items():
+            merged[path] = merged.get(path, 0) + count
+    return merged
+
+def merge_stats(results):
+    """
+    Merge the statistics of several osm files. The merged boundaries cover the
+    boundaries of all the osm files.
+    """
+    merged = {'size': 0, 'bounds': None, 'elements': {}}
+    for result in results:
+        merged['size'] = round(merged['size'] + result['size'], 1)
+        merged['elements'] = merge_counts([merged['elements'], result['elements']])
+        bounds = result['bounds']
+        if bounds is None:
+            continue
+        if merged['bounds'] is None:
+            merged['bounds'] = {'Latitude': [float(x) for x in bounds['Latitude']],
+                                'Longitude': [float(x) for x in bounds['Longitude']]}
+            continue
+        for axis in ('Latitude', 'Longitude'):
+            low, high = merged['bounds'][axis]
+            merged['bounds'][axis] = [min(low, float(bounds[axis][0])),
+                                      max(high, float(bounds[axis][1]))]
+    return merged
+
+MERGE_FUNCTIONS = {'audit': merge_problems,
+                   'clean': merge_problems,
+                   'export': merge_counts,
+                   'stats': merge_stats}
+
+
+#               Main Functions
+
+def run(command, osm_files, output_dir, jobs=None, region=funcvar.REGION,
+        tag_encoding=export.PLAIN_TAGS):
+    """
+    Run a command on several osm files concurrently, write a report for every
+    osm file and a summary that merges all of them.
+    Args:
+        command: audit, clean, export, or stats
+        osm_files: list of osm files
+        output_dir: directory of the reports
+        jobs: number of worker processes, all processors if None
+        region: region profile used to audit and clean the osm files
+        tag_encoding: plain, or dict to dictionary-encode the exported tags
+    Returns:
+        the summary
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    start = time.time()
+    # The workers compile the profile once in their initializer
+    funcvar.use_region(region)
+    names = get_report_names(osm_files)
+    reports = {}
+    errors = {}
+    if jobs == 1:
+        for osm_file in osm_files:
+            try:
+                reports[osm_file] = run_task(command, osm_file, names[osm_file], output_dir,
+                                             tag_encoding)
+            except Exception as e:
+                errors[osm_file] = repr(e)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=funcvar.use_region,
+                                 initargs=(region,)) as executor:
+            futures = dict((executor.submit(run_task, command, osm_file, names[osm_file],
+                                            output_dir, tag_encoding),
+                            osm_file)
+                           for osm_file in osm_files)
+            for future in as_completed(futures):
+                osm_file = futures[future]
+                try:
+                    reports[osm_file] = future.result()
+                except Exception as e:
+                    errors[osm_file] = repr(e)
+    results = [reports[f]['result'] for f in osm_files if f in reports]
+    summary = {'command': command,
+               'region': funcvar.REGION_NAME,
+               'files': [f for f in osm_files if f in reports],
+               'reports': dict((f, names[f] + '.json') for f in osm_files if f in reports),
+               'errors': errors,
+               'time': round(time.time() - start, 3),
+               'result': MERGE_FUNCTIONS[command](results)}
+    write_report(summary, os.path.join(output_dir, SUMMARY_NAME + '.json'))
+    return summary
+
+def positive_int(value):
+    """
+    Parse a positive integer command-line argument.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be a positive integer: ' + repr(value))
+    return number
+
+def get_parser():
+    """
+    Get the command-line argument parser.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('paths', nargs='*', default=[funcvar.OSM_PATH],
+                        help='osm files or directories of osm files (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=None,
+                        help='number of worker processes (default: all processors)')
+    parser.add_argument('-r', '--region', default=funcvar.REGION,
+                        help='region profile name or path, one of ' + ', '.join(region.get_region_names())
+                        + ' (default: %(default)s)')
+    parser.add_argument('--tag-encoding', choices=export.TAG_ENCODINGS, default=export.PLAIN_TAGS,
+                        help='encoding of the exported tags (default: %(default)s)')
+    parser.add_argument('-o', '--output-dir', default='reports',
+                        help='directory of the reports (default: %(default)s)')
+    return parser
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    osm_files = get_osm_files(args.paths)
+    if not osm_files:
+        print ("No osm files found in " + ", ".join(args.paths))
+        return 1
+    summary = run(args.command, osm_files, args.output_dir, args.jobs, args.region,
+                  args.tag_encoding)
+    print (args.command.title() + " of " + str(len(summary['files'])) + " files written to "
+           + args.output_dir)
+    for osm_file, error in sorted(summary['errors'].items()):
+        print ("Failed " + osm_file + ": " + error)
+    print ("Time elapsed: " + str(summary['time']) + " seconds")
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
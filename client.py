@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Client of the cleaning service (see service.py). Pipelines use this module to
+clean and audit street names, city names, and zip codes without importing the
+cleaning code, so they do not pay its import and warm-up costs.
+
+Example:
+    with client.Client() as c:
+        streets = c.clean('street', ['W Bufford St', 'S Hurst Rd.'])
+        problems = c.audit('zip', ['76028', '7602'])
+        print (c.last_response['latency_ms'], c.last_response['cache'])
+
+Messages are json objects, one per line. A request is
+{"id": 1, "op": "clean", "field": "street", "values": [...]} and its response is
+{"id": 1, "ok": true, "results": [...], "queued_ms": 0.0, "latency_ms": 0.1,
+"cache": {...}}.
+"""
+
+import json
+import os
+import socket
+import tempfile
+
+# The Unix socket of the service
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'osm_cleaning.sock')
+FIELDS = ('street', 'city', 'zip')
+
+
+class ServiceError(RuntimeError):
+    """Error returned by the cleaning service"""
+
+
+class Client(object):
+    """
+    Connection to the cleaning service, over a Unix socket or over localhost TCP
+    when a port is given.
+    Args:
+        path: Unix socket of the service
+        host: host of the service when a port is given
+        port: TCP port of the service
+        timeout: socket timeout in seconds
+    """
+
+    def __init__(self, path=SOCKET_PATH, host='127.0.0.1', port=None, timeout=60):
+        if port is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout)
+        self.file = self.sock.makefile('rwb')
+        self.last_id = 0
+        self.last_response = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the connection"""
+        self.file.close()
+        self.sock.close()
+
+    def request(self, op, field=None, values=None):
+        """
+        Send a request to the service and wait for its response.
+        Args:
+            op: clean, audit, stats, or ping
+            field: street, city, or zip
+            values: list of values
+        Returns:
+            the response in a dictionary
+        """
+        self.last_id += 1
+        message = {'id': self.last_id, 'op': op}
+        if field is not None:
+            message['field'] = field
+        if values is not None:
+            if isinstance(values, str):
+                raise TypeError('values must be a list of strings, not a string')
+            message['values'] = list(values)
+        self.file.write(json.dumps(message).encode('utf-8') + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ServiceError('connection closed by the service')
+        response = json.loads(line.decode('utf-8'))
+        self.last_response = response
+        if not response.get('ok'):
+            raise ServiceError(response.get('error'))
+        return response
+
+    def clean(self, field, values):
+        """
+        Clean values.
+        Args:
+            field: street, city, or zip
+            values: list of values
+        Returns:
+            list of cleaned values or None
+        """
+        return self.request('clean', field, values)['results']
+
+    def audit(self, field, values):
+        """
+        Audit values.
+        Args:
+            field: street, city, or zip
+            values: list of values
+        Returns:
+            list of the problems of every value, a problem is a
+            [problem set, category] pair (e.g. ['problem_zipcodes', 'non 5-digit'])
+        """
+        return self.request('audit', field, values)['results']
+
+    def stats(self):
+        """
+        Get the region, uptime, and cache metrics of the service.
+        """
+        return self.request('stats')
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Load the csv files exported by export.py into the database. A load can be
+incremental: the nodes, ways, and relations already in the database are replaced
+by the ones in the csv files, together with their tags, nodes, and members. The
+summary tables of analytics.py are updated in the same transaction.
+
+A new database can store the tags dictionary-encoded: the tag keys and tag types
+are interned in the tag_keys and tag_types tables, and nodes_tags_codes,
+ways_tags_codes, and relations_tags_codes store their ids. The nodes_tags,
+ways_tags, and relations_tags views keep the column layout of the plain tag
+tables, so the queries of the project report work on both layouts. Both plain
+and dictionary-encoded csv files can be loaded into both layouts.
+
+Examples:
+    python cli.py export extracts/ --output-dir csv
+    python database.py csv/tarrant csv/johnson --db burleson.db
+    python database.py csv/tarrant --db burleson.db --tag-encoding dict
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import time
+import funcvar
+import export
+import analytics
+
+# Tables and their schema
+SCHEMA = [
+    ('nodes',
+     """CREATE TABLE IF NOT EXISTS nodes (
+         id INTEGER PRIMARY KEY NOT NULL,
+         lat REAL,
+         lon REAL,
+         user TEXT,
+         uid INTEGER,
+         version INTEGER,
+         changeset INTEGER,
+         timestamp TEXT)"""),
+    ('nodes_tags',
+     """CREATE TABLE IF NOT EXISTS nodes_tags (
+         id INTEGER NOT NULL,
+         key TEXT,
+         value TEXT,
+         type TEXT,
+         FOREIGN KEY (id) REFERENCES nodes (id))"""),
+    ('ways',
+     """CREATE TABLE IF NOT EXISTS ways (
+         id INTEGER PRIMARY KEY NOT NULL,
+         user TEXT,
+         uid INTEGER,
+         version INTEGER,
+         changeset INTEGER,
+         timestamp TEXT)"""),
+    ('ways_tags',
+     """CREATE TABLE IF NOT EXISTS ways_tags (
+         id INTEGER NOT NULL,
+         key TEXT,
+         value TEXT,
+         type TEXT,
+         FOREIGN KEY (id) REFERENCES ways (id))"""),
+    ('ways_nodes',
+     """CREATE TABLE IF NOT EXISTS ways_nodes (
+         id INTEGER NOT NULL,
+         node_id INTEGER NOT NULL,
+         position INTEGER NOT NULL,
+         FOREIGN KEY (id) REFERENCES ways (id))"""),
+    ('relations',
+     """CREATE TABLE IF NOT EXISTS relations (
+         id INTEGER PRIMARY KEY NOT NULL,
+         user TEXT,
+         uid INTEGER,
+         version INTEGER,
+         changeset INTEGER,
+         timestamp TEXT)"""),
+    ('relations_tags',
+     """CREATE TABLE IF NOT EXISTS relations_tags (
+         id INTEGER NOT NULL,
+         key TEXT,
+         value TEXT,
+         type TEXT,
+         FOREIGN KEY (id) REFERENCES relations (id))"""),
+    ('relations_nodes',
+     """CREATE TABLE IF NOT EXISTS relations_nodes (
+         id INTEGER NOT NULL,
+         node_id INTEGER NOT NULL,
+         position INTEGER NOT NULL,
+         role TEXT,
+         FOREIGN KEY (id) REFERENCES relations (id))"""),
+    ('relations_ways',
+     """CREATE TABLE IF NOT EXISTS relations_ways (
+         id INTEGER NOT NULL,
+         way_id INTEGER NOT NULL,
+         position INTEGER NOT NULL,
+         role TEXT,
+         FOREIGN KEY (id) REFERENCES relations (id))"""),
+    ('relations_relations',
+     """CREATE TABLE IF NOT EXISTS relations_relations (
+         id INTEGER NOT NULL,
+         relation_id INTEGER NOT NULL,
+         position INTEGER NOT NULL,
+         role TEXT,
+         FOREIGN KEY (id) REFERENCES relations (id))""")]
+
+ENCODED_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS tag_keys (
+        id INTEGER PRIMARY KEY NOT NULL,
+        key TEXT UNIQUE NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS tag_types (
+        id INTEGER PRIMARY KEY NOT NULL,
+        type TEXT UNIQUE NOT NULL)"""]
+
+# Schema of the dictionary-encoded tags of nodes, ways, and relations, with
+# {table} and {element_table} replaced by e.g. nodes_tags and nodes
+ENCODED_TAGS_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS {table}_codes (
+        id INTEGER NOT NULL,
+        key_id INTEGER,
+        value TEXT,
+        type_id INTEGER,
+        FOREIGN KEY (id) REFERENCES {element_table} (id),
+        FOREIGN KEY (key_id) REFERENCES tag_keys (id),
+        FOREIGN KEY (type_id) REFERENCES tag_types (id))""",
+    """CREATE INDEX IF NOT EXISTS {table}_codes_type_key ON {table}_codes (type_id, key_id)""",
+    """CREATE VIEW IF NOT EXISTS {table} AS
+        SELECT t.id AS id, k.key AS key, t.value AS value, y.type AS type
+        FROM {table}_codes t
+        LEFT JOIN tag_keys k ON k.id = t.key_id
+        LEFT JOIN tag_types y ON y.id = t.type_id""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_insert INSTEAD OF INSERT ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO tag_keys (key) VALUES (NEW.key);
+            INSERT OR IGNORE INTO tag_types (type) VALUES (NEW.type);
+            INSERT INTO {table}_codes (id, key_id, value, type_id) VALUES (
+                NEW.id,
+                (SELECT id FROM tag_keys WHERE key = NEW.key),
+                NEW.value,
+                (SELECT id FROM tag_types WHERE type = NEW.type));
+        END"""]
+
+# Elements, their tables, and the tables of their children
+ELEMENTS = [('node', 'nodes', ['nodes_tags']),
+            ('way', 'ways', ['ways_tags', 'ways_nodes']),
+            ('relation', 'relations', ['relations_tags', 'relations_nodes',
+                                       'relations_ways', 'relations_relations'])]
+TAG_TABLES = ['nodes_tags', 'ways_tags', 'relations_tags']
+
+
+#               Database Functions
+
+def get_table_path(table):
+    """
+    Get the csv file of a table (e.g. nodes_tags returns nodes_tags.csv)
+    """
+    for path in funcvar.csv_files:
+        if os.path.splitext(path)[0] == table:
+            return path
+    raise ValueError('no csv file for table ' + table)
+
+def is_dict_encoded(conn):
+    """Check whether the database stores dictionary-encoded tags"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tag_keys'"
+                        ).fetchone() is not None
+
+def get_storage_table(conn, table):
+    """
+    Get the table that stores the rows of a table (e.g. nodes_tags returns
+    nodes_tags_codes in a database of dictionary-encoded tags)
+    """
+    if table in TAG_TABLES and is_dict_encoded(conn):
+        return table + '_codes'
+    return table
+
+def connect(db_path=funcvar.DB_PATH, tag_encoding=None):
+    """
+    Connect to the database, and create the tables and the summary tables if
+    they do not exist. Summary tables created on a database that already has
+    elements are filled from its tables.
+    Args:
+        db_path: database file
+        tag_encoding: plain, or dict to store dictionary-encoded tags in a new
+            database. An existing database keeps its layout.
+    Returns:
+        sqlite3 connection
+    """
+    conn = sqlite3.connect(db_path)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'nodes'").fetchone()
+    if exists:
+        encoded = is_dict_encoded(conn)
+        if tag_encoding is not None and encoded != (tag_encoding == export.DICT_TAGS):
+            conn.close()
+            raise ValueError(db_path + ' does not store ' + tag_encoding + ' tags')
+    else:
+        encoded = tag_encoding == export.DICT_TAGS
+    if encoded:
+        for statement in ENCODED_SCHEMA:
+            conn.execute(statement)
+    for table, statement in SCHEMA:
+        if encoded and table in TAG_TABLES:
+            element_table = [t for _, t, children in ELEMENTS if table in children][0]
+            for encoded_statement in ENCODED_TAGS_SCHEMA:
+                conn.execute(encoded_statement.format(table=table, element_table=element_table))
+        else:
+            conn.execute(statement)
+    # Children are replaced by the id of their element on incremental loads
+    for _, _, children in ELEMENTS:
+        for table in children:
+            storage_table = get_storage_table(conn, table)
+            conn.execute("CREATE INDEX IF NOT EXISTS " + storage_table + "_id ON "
+                         + storage_table + " (id)")
+    summarized = analytics.has_summaries(conn)
+    analytics.create_summaries(conn)
+    conn.commit()
+    if not summarized and has_elements(conn):
+        rebuild_summaries(conn)
+    return conn
+
+def has_elements(conn):
+    """Check whether the database has nodes, ways, or relations"""
+    return any(conn.execute("SELECT 1 FROM " + table + " LIMIT 1").fetchone() is not None
+               for _, table, _ in ELEMENTS)
+
+def read_dictionary(csv_dir, path):
+    """
+    Read the tag keys or tag types of dictionary-encoded tags.
+    Returns:
+        dictionary of ids and their tag keys or tag types
+    """
+    with open(os.path.join(csv_dir, path), newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return dict((i, v) for i, v in reader)
+
+def read_csv(csv_dir, table):
+    """
+    Yield the rows of the csv file of a table, in the column order of the table.
+    Dictionary-encoded tags are decoded, and empty values are read as NULL.
+    """
+    path = get_table_path(table)
+    fields = export.CSV_FIELDS[path]
+    keys = types = None
+    with open(os.path.join(csv_dir, path), newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        # The header of a tag csv tells whether its tags are dictionary-encoded
+        if 'key_id' in (reader.fieldnames or []):
+            keys = read_dictionary(csv_dir, funcvar.TAG_KEYS_PATH)
+            types = read_dictionary(csv_dir, funcvar.TAG_TYPES_PATH)
+        for row in reader:
+            if keys is not None:
+                row['key'] = keys[row.pop('key_id')]
+                row['type'] = types[row.pop('type_id')]
+            yield tuple(row[field] if row[field] != '' else None for field in fields)
+
+def stage_csv(conn, csv_dir, table):
+    """
+    Read the csv file of a table into a temporary staging table, with the
+    column layout of the plain table.
+    Returns:
+        name of the staging table
+    """
+    staged = 'staged_' + table
+    fields = export.CSV_FIELDS[get_table_path(table)]
+    conn.execute("DROP TABLE IF EXISTS temp." + staged)
+    conn.execute("CREATE TEMP TABLE " + staged + " AS SELECT * FROM main." + table + " WHERE 0")
+    conn.executemany("INSERT INTO temp." + staged + " VALUES (" + ", ".join("?" * len(fields)) + ")",
+                     read_csv(csv_dir, table))
+    return 'temp.' + staged
+
+def insert_staged(conn, table, staged):
+    """
+    Insert the rows of a staging table into a table. Tags are dictionary-encoded
+    for a database of dictionary-encoded tags.
+    Returns:
+        count of inserted rows
+    """
+    storage_table = get_storage_table(conn, table)
+    if storage_table == table:
+        return conn.execute("INSERT INTO " + table + " SELECT * FROM " + staged).rowcount
+    conn.execute("INSERT OR IGNORE INTO tag_keys (key) SELECT DISTINCT key FROM " + staged
+                 + " WHERE key IS NOT NULL")
+    conn.execute("INSERT OR IGNORE INTO tag_types (type) SELECT DISTINCT type FROM " + staged
+                 + " WHERE type IS NOT NULL")
+    return conn.execute("""
+        INSERT INTO """ + storage_table + """ (id, key_id, value, type_id)
+        SELECT s.id, k.id, s.value, y.id FROM """ + staged + """ s
+        LEFT JOIN tag_keys k ON k.key = s.key
+        LEFT JOIN tag_types y ON y.type = s.type""").rowcount
+
+def load_csv_dir(conn, csv_dir):
+    """
+    Load the csv files of an exported osm file into the database. Elements
+    already in the database are replaced, and the summary tables are updated.
+    Args:
+        conn: sqlite3 connection
+        csv_dir: directory of the csv files
+    Returns:
+        the count of rows loaded into each table in a dictionary
+    """
+    counts = {}
+    with conn:
+        for element, table, children in ELEMENTS:
+            staged = dict((t, stage_csv(conn, csv_dir, t)) for t in [table] + children)
+            replaced = "(SELECT id FROM " + staged[table] + ")"
+            tags = [t for t in children if t in TAG_TABLES]
+            # Subtract the elements that are replaced from the summary tables
+            analytics.update_summaries(
+                conn,
+                [(element, "(SELECT * FROM " + table + " WHERE id IN " + replaced + ")")],
+                ["(SELECT * FROM " + t + " WHERE id IN " + replaced + ")" for t in tags],
+                -1)
+            for t in children + [table]:
+                conn.execute("DELETE FROM " + get_storage_table(conn, t) + " WHERE id IN " + replaced)
+            analytics.update_summaries(conn, [(element, staged[table])],
+                                       [staged[t] for t in tags])
+            for t in [table] + children:
+                counts[t] = insert_staged(conn, t, staged[t])
+                conn.execute("DROP TABLE " + staged[t])
+        analytics.prune_summaries(conn)
+    return counts
+
+def rebuild_summaries(conn):
+    """
+    Count all the elements and tags of the database again into the summary tables.
+    """
+    with conn:
+        analytics.rebuild_summaries(conn, [(element, table) for element, table, _ in ELEMENTS],
+                                    TAG_TABLES)
+
+def find_tags(conn, tag_type, key=None, tables=TAG_TABLES):
+    """
+    Find the tags of a type, e.g. all addr:* tags, or of a type and key. In a
+    database of dictionary-encoded tags the tags are filtered on the ids of the
+    type and key instead of strings.
+    Args:
+        conn: sqlite3 connection
+        tag_type: tag type, e.g. addr
+        key: tag key, e.g. street, all the keys of the type if None
+        tables: tag tables to search
+    Returns:
+        list of (id, key, value, type)
+    """
+    if not is_dict_encoded(conn):
+        condition = "type = ?" + (" AND key = ?" if key is not None else "")
+        params = (tag_type,) + ((key,) if key is not None else ())
+        query = " UNION ALL ".join("SELECT id, key, value, type FROM " + t + " WHERE " + condition
+                                   for t in tables)
+        return conn.execute(query, params * len(tables)).fetchall()
+    type_id = conn.execute("SELECT id FROM tag_types WHERE type = ?", (tag_type,)).fetchone()
+    key_id = conn.execute("SELECT id FROM tag_keys WHERE key = ?", (key,)).fetchone()
+    if type_id is None or (key is not None and key_id is None):
+        return []
+    condition = "t.type_id = ?" + (" AND t.key_id = ?" if key is not None else "")
+    params = type_id + (key_id if key is not None else ())
+    query = " UNION ALL ".join("SELECT t.id, k.key, t.value, ? FROM " + t + "_codes t"
+                               + " JOIN tag_keys k ON k.id = t.key_id WHERE " + condition
+                               for t in tables)
+    return conn.execute(query, ((tag_type,) + params) * len(tables)).fetchall()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_dirs', nargs='*', default=[],
+                        help='directories of exported csv files')
+    parser.add_argument('--db', default=funcvar.DB_PATH,
+                        help='database file (default: %(default)s)')
+    parser.add_argument('--tag-encoding', choices=export.TAG_ENCODINGS, default=None,
+                        help='tag encoding of a new database (default: plain)')
+    parser.add_argument('--rebuild-summaries', action='store_true',
+                        help='count the whole database again into the summary tables')
+    args = parser.parse_args(argv)
+    start = time.time()
+    conn = connect(args.db, args.tag_encoding)
+    for csv_dir in args.csv_dirs:
+        print ("Loading " + csv_dir + " into " + args.db)
+        counts = load_csv_dir(conn, csv_dir)
+        for table, count in counts.items():
+            print ("    " + table + ": " + str(count) + " rows")
+    if args.rebuild_summaries:
+        print ("Rebuilding the summary tables of " + args.db)
+        rebuild_summaries(conn)
+    conn.close()
+    print ("Time elapsed: " + str(time.time() - start) + " seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+# -*- coding: utf-8 -*-
+"""
+Differential equivalence harness for the optimized paths. The legacy functions
+in clean.py and audit.py are run side by side with the optimized paths (the batch
+functions, the loaded region profiles, and the concurrent cli runs) over the
+values of osm files and over generated street names. Every cleaned value and the
+full audit reports are compared, and the throughput of both paths is displayed.
+
+The legacy functions may drift from the original behaviour together with the
+optimized paths, so both are also compared with golden outputs: the results of
+the original cleaning and auditing code over the values of the sample osm file
+and over seeded generated values (see golden/burleson.json). The
+golden outputs are written by running the original code of a baseline checkout
+(e.g. made with git worktree) in a separate process, and are only regenerated
+after an intended change of behaviour.
+
+Examples:
+    python equivalence.py burlesonsample.osm
+    python equivalence.py extracts/ --fuzz 100000 --seed 7 --jobs 4
+    python equivalence.py burlesonsample.osm --fuzz 2000 --write-golden --baseline-dir ../baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import funcvar
+import region
+import audit
+import clean
+import batch
+import cli
+
+MAX_DIFFS = 20
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'burleson.json')
+
+# Functions that clean one value and their optimized path
+CLEAN_PATHS = [('street names', clean.clean_street_name, batch.clean_street_names),
+               ('city names', clean.clean_city_name, batch.clean_city_names),
+               ('zip codes', clean.clean_zipcode, batch.clean_zipcodes)]
+
+# Functions that clean and audit one value, their problem sets, and their optimized path
+AUDIT_PATHS = [('city names', clean.clean_city_name, audit.audit_city_name, 'problem_cities',
+                batch.audit_city_names),
+               ('zip codes', clean.clean_zipcode, audit.audit_zipcode, 'problem_zipcodes',
+                batch.audit_zipcodes)]
+
+# Functions of the original code that clean and audit one value
+BASELINE_FUNCTIONS = {'street names': ('clean_street_name', 'audit_street_name'),
+                      'city names': ('clean_city_name', 'audit_city_name'),
+                      'zip codes': ('clean_zipcode', 'audit_zipcode')}
+
+# Script run in a baseline checkout: reads the values of every name as json on
+# stdin, and writes the cleaned values and the problems of every value as json
+BASELINE_SCRIPT = """
+import json
+import sys
+import audit
+import clean
+
+def get_problems(f, v):
+    problem_sets = [n for n in dir(audit) if n.startswith('problem_')]
+    for n in problem_sets:
+        getattr(audit, n).clear()
+    f(v)
+    return sorted([n, k] for n in problem_sets for k in getattr(audit, n))
+
+values = json.load(sys.stdin)
+functions = json.loads(sys.argv[1])
+golden = {'clean': {}, 'audit': {}}
+for name, (clean_function, audit_function) in functions.items():
+    cleaned = [[v, getattr(clean, clean_function)(v)] for v in values[name]]
+    audited = list(dict.fromkeys(values[name] + [c for _, c in cleaned if c]))
+    golden['clean'][name] = cleaned
+    golden['audit'][name] = [[v, get_problems(getattr(audit, audit_function), v)] for v in audited]
+json.dump(golden, sys.stdout)
+"""
+
+
+#               Street Name Fuzzer
+
+STREET_NUMBERS = ['7604', '1', '12B', '300', '1600']
+STREET_POINTS = ['N', 'S.', 'South', 'NW', 'se', 'E', 'W.', 'North', 'sw']
+STREET_WORDS = ['Dobson', 'Wilshire', "O'Neil", "Mary'S", 'Hurst', 'Oak Grove',
+                'Avenue', 'Main', 'Business', 'Old', 'John Jones', 'Renfro']
+STREET_ORDINALS = ['1St', '5th', '14TH', '2nd', '3RD', '56th']
+STREET_TYPES = ['St', 'St.', 'Street', 'Rd', 'rd.', 'Blvd', 'Ave', 'Av', 'Dr', 'Pkwy',
+                'Hwy', 'Trail', 'Trl', 'Ln', 'Fwy', 'Expy', 'Cir', 'Ct', 'Frontage']
+STREET_HIGHWAYS = ['FM 1187', 'I-35W', 'IH 35 W', 'Interstate 35', 'US 287', 'Highway 174',
+                   'SH 121', 'County Road 707', 'Loop 820', 'FM731', 'I 20', 'Spur 408']
+STREET_SUITES = ['Suite 150', 'Ste 201', '# 5', '#12', 'Building 3', 'No. 4', 'ste. 9', 'Suite B-2']
+STREET_PUNCTUATION = [',', ';', '; Apt 3', '.', "'S"]
+
+def generate_street_tokens(rng):
+    """
+    Generate the tokens of a random street name, e.g. ['7604', 'S.', 'Dobson', 'St', 'Ste 201'].
+    Args:
+        rng: random.Random
+    Returns:
+        list of tokens
+    """
+    tokens = []
+    if rng.random() < 0.3:
+        tokens.append(rng.choice(STREET_NUMBERS))
+    if rng.random() < 0.3:
+        tokens.append(rng.choice(STREET_POINTS))
+    if rng.random() < 0.3:
+        tokens.append(rng.choice(STREET_HIGHWAYS))
+    else:
+        for _ in range(rng.randint(1, 2)):
+            tokens.append(rng.choice(STREET_WORDS + STREET_ORDINALS))
+        if rng.random() < 0.8:
+            tokens.append(rng.choice(STREET_TYPES))
+    if rng.random() < 0.2:
+        tokens.append(rng.choice(STREET_POINTS))
+    if rng.random() < 0.2:
+        tokens.append(rng.choice(STREET_SUITES))
+    if rng.random() < 0.2:
+        tokens.insert(rng.randint(1, len(tokens)), rng.choice(STREET_PUNCTUATION))
+    # Mix up the case of the tokens
+    for i, token in enumerate(tokens):
+        case = rng.random()
+        if case < 0.1:
+            tokens[i] = token.upper()
+        elif case < 0.2:
+            tokens[i] = token.lower()
+    return tokens
+
+def join_street_tokens(tokens):
+    """Join the tokens of a street name, punctuation is attached to the previous token"""
+    s = ''
+    for token in tokens:
+        if s and token not in STREET_PUNCTUATION:
+            s += ' '
+        s += token
+    return s
+
+def shrink_street_tokens(tokens, is_different):
+    """
+    Shrink the tokens of a street name that gives different results to the
+    smallest list of tokens that still gives different results.
+    Args:
+        tokens: list of tokens
+        is_different: function that checks whether a street name gives different results
+    Returns:
+        list of tokens
+    """
+    shrunk = True
+    while shrunk and len(tokens) > 1:
+        shrunk = False
+        for i in range(len(tokens)):
+            candidate = tokens[:i] + tokens[i + 1:]
+            if is_different(join_street_tokens(candidate)):
+                tokens = candidate
+                shrunk = True
+                break
+    return tokens
+
+def generate_street_names(count, seed=0):
+    """
+    Generate random street names.
+    Args:
+        count: number of street names
+        seed: seed of the random generator
+    Returns:
+        list of (street name, tokens)
+    """
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        tokens = generate_street_tokens(rng)
+        names.append((join_street_tokens(tokens), tokens))
+    return names
+
+
+#               City Name and Zip Code Generators
+
+CITY_NAMES = ['Burleson', 'Crowley', 'Joshua', 'Alvarado', 'Fort Worth', 'Ft Worth', 'Ft. Worth',
+              'Dfw', 'Tarrant County', 'Cleburne', 'Mansfield', 'Keene']
+CITY_SUFFIXES = [', TX', ' TX', ' Tx.', ' Texas', ', Texas 76028', ', tx', '.', ' 2', ' County']
+ZIP_PREFIXES = ['', '', '', 'TX ', 'Tx', '#', ' ']
+ZIP_STARTS = ['76', '76', '75', '77', '73', '7', '']
+ZIP_SUFFIXES = ['', '', '', '-1234', '-', ' ', 'a', '.0']
+
+def generate_city_names(count, seed=0):
+    """
+    Generate random city names, e.g. Ft. Worth, TX.
+    Args:
+        count: number of city names
+        seed: seed of the random generator
+    Returns:
+        list of city names
+    """
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        c = rng.choice(CITY_NAMES)
+        if rng.random() < 0.5:
+            c += rng.choice(CITY_SUFFIXES)
+        case = rng.random()
+        if case < 0.1:
+            c = c.upper()
+        elif case < 0.2:
+            c = c.lower()
+        names.append(c)
+    return names
+
+def generate_zipcodes(count, seed=0):
+    """
+    Generate random zip code values, e.g. TX 76028-1234.
+    Args:
+        count: number of zip code values
+        seed: seed of the random generator
+    Returns:
+        list of zip code values
+    """
+    rng = random.Random(seed)
+    zipcodes = []
+    for _ in range(count):
+        start = rng.choice(ZIP_STARTS)
+        digits = ''.join(rng.choice('0123456789') for _ in range(rng.randint(1, 5)))
+        zipcodes.append(rng.choice(ZIP_PREFIXES) + start + digits + rng.choice(ZIP_SUFFIXES))
+    return zipcodes
+
+
+#               Comparing Functions
+
+def get_outcome(f, v):
+    """Get the result of a function, or the exception it raises"""
+    try:
+        return f(v)
+    except Exception as e:
+        return 'error: ' + repr(e)
+
+def get_batch_outcomes(f, values):
+    """
+    Get the results of a batch function, or the exceptions it raises for every value.
+    """
+    try:
+        return list(f(values))
+    except Exception:
+        return [get_outcome(lambda v: list(f([v]))[0], v) for v in values]
+
+def get_rate(count, seconds):
+    """Get the number of values per second"""
+    return round(count / seconds, 1) if seconds > 0 else None
+
+def compare_cleaning(name, legacy, optimized, values):
+    """
+    Clean values with the legacy function and with the optimized path and compare
+    the cleaned values.
+    Args:
+        name: name of the values
+        legacy: function that cleans one value
+        optimized: function that cleans a list of values
+        values: list of values
+    Returns:
+        comparison in a dictionary, including the differences and the throughput
+    """
+    start = time.time()
+    expected = [get_outcome(legacy, v) for v in values]
+    legacy_time = time.time() - start
+    start = time.time()
+    actual = get_batch_outcomes(optimized, values)
+    optimized_time = time.time() - start
+    diffs = [(v, e, a) for v, e, a in zip(values, expected, actual) if e != a]
+    return {'name': 'clean ' + name,
+            'count': len(values),
+            'diffs': diffs,
+            'legacy_rate': get_rate(len(values), legacy_time),
+            'optimized_rate': get_rate(len(values), optimized_time)}
+
+def get_legacy_report(legacy, values):
+    """
+    Audit values with a legacy function.
+    Returns:
+        audit report (see audit.get_audit_result)
+    """
+    audit.reset_audit_result()
+    for v in values:
+        legacy(v)
+    return audit.get_audit_result()
+
+def get_optimized_report(problem_set, optimized, values):
+    """
+    Audit values with an optimized path.
+    Returns:
+        audit report of the problem set of the optimized path (see audit.get_audit_result)
+    """
+    masks = optimized(values)
+    actual = {}
+    for category, mask in masks.items():
+        problems = set(v for v, m in zip(values, mask) if m)
+        if problems:
+            actual[category] = problems
+    return {problem_set: actual}
+
+def compare_auditing(name, legacy, problem_set, optimized, values):
+    """
+    Audit values with the legacy function and with the optimized path and compare
+    the audit reports.
+    Args:
+        name: name of the values
+        legacy: function that audits one value
+        problem_set: name of the problem set of the legacy function (see audit.AUDIT_RESULT)
+        optimized: function that returns the problem masks of a list of values
+        values: list of values
+    Returns:
+        comparison in a dictionary, including the differences and the throughput
+    """
+    start = time.time()
+    expected = get_legacy_report(legacy, values)[problem_set]
+    legacy_time = time.time() - start
+    start = time.time()
+    actual = get_optimized_report(problem_set, optimized, values)
+    optimized_time = time.time() - start
+    return {'name': 'audit ' + name,
+            'count': len(values),
+            'diffs': diff_reports({problem_set: expected}, actual),
+            'legacy_rate': get_rate(len(values), legacy_time),
+            'optimized_rate': get_rate(len(values), optimized_time)}
+
+def compare_street_fuzz(count, seed=0):
+    """
+    Clean generated street names with the legacy function and with the optimized
+    path, and shrink the street names that give different results. Drift of both
+    from the original code is found by compare_golden.
+    Args:
+        count: number of street names
+        seed: seed of the random generator
+    Returns:
+        comparison in a dictionary, including the shrunk differences and the throughput
+    """
+    legacy = clean.clean_street_name
+    optimized = batch.clean_street_names
+    names = generate_street_names(count, seed)
+    comparison = compare_cleaning('generated street names', legacy, optimized,
+                                  [s for s, _ in names])
+    tokens = dict(names)
+    is_different = lambda s: get_outcome(legacy, s) != get_batch_outcomes(optimized, [s])[0]
+    shrunk = []
+    for v, e, a in comparison['diffs'][:MAX_DIFFS]:
+        s = join_street_tokens(shrink_street_tokens(tokens[v], is_different))
+        shrunk.append((s, get_outcome(legacy, s), get_batch_outcomes(optimized, [s])[0]))
+    comparison['diffs'] = shrunk + comparison['diffs'][MAX_DIFFS:]
+    return comparison
+
+def compare_golden_cleaning(name, golden, legacy, optimized):
+    """
+    Clean the values of the golden outputs with the legacy function and with the
+    optimized path, and compare both with the golden cleaned values.
+    Args:
+        name: name of the values
+        golden: list of [value, cleaned value] of the original code
+        legacy: function that cleans one value
+        optimized: function that cleans a list of values
+    Returns:
+        list of two comparisons in dictionaries, including the differences and the throughput
+    """
+    values = [v for v, _ in golden]
+    expected = [c for _, c in golden]
+    comparisons = []
+    for path, f in (('legacy', lambda vs: [get_outcome(legacy, v) for v in vs]),
+                    ('optimized', lambda vs: get_batch_outcomes(optimized, vs))):
+        start = time.time()
+        actual = f(values)
+        rate = get_rate(len(values), time.time() - start)
+        comparisons.append({'name': 'clean ' + name + ' with golden ' + path,
+                            'count': len(values),
+                            'diffs': [(v, e, a) for v, e, a in zip(values, expected, actual) if e != a],
+                            path + '_rate': rate})
+    return comparisons
+
+def compare_golden_auditing(name, golden, legacy, problem_set=None, optimized=None):
+    """
+    Audit the values of the golden outputs with the legacy function and with the
+    optimized path, and compare both with the golden audit report.
+    Args:
+        name: name of the values
+        golden: list of [value, list of [problem set, category]] of the original code
+        legacy: function that audits one value
+        problem_set: name of the problem set of the optimized path
+        optimized: function that returns the problem masks of a list of values, or
+            None if there is no optimized path
+    Returns:
+        list of comparisons in dictionaries, including the differences and the throughput
+    """
+    values = [v for v, _ in golden]
+    expected = {}
+    for v, problems in golden:
+        for n, category in problems:
+            expected.setdefault(n, {}).setdefault(category, set()).add(v)
+    start = time.time()
+    actual = get_legacy_report(legacy, values)
+    comparisons = [{'name': 'audit ' + name + ' with golden legacy',
+                    'count': len(values),
+                    'diffs': diff_reports(expected, actual),
+                    'legacy_rate': get_rate(len(values), time.time() - start)}]
+    if optimized is not None:
+        start = time.time()
+        actual = get_optimized_report(problem_set, optimized, values)
+        comparisons.append({'name': 'audit ' + name + ' with golden optimized',
+                            'count': len(values),
+                            'diffs': diff_reports({problem_set: expected.get(problem_set, {})},
+                                                  actual),
+                            'optimized_rate': get_rate(len(values), time.time() - start)})
+    return comparisons
+
+def compare_golden(golden):
+    """
+    Compare the legacy functions and the optimized paths with the golden outputs
+    of the original code.
+    Args:
+        golden: golden outputs in a dictionary (see write_golden)
+    Returns:
+        list of comparisons
+    """
+    comparisons = []
+    for name, legacy, optimized in CLEAN_PATHS:
+        comparisons += compare_golden_cleaning(name, golden['clean'][name], legacy, optimized)
+    optimized_audits = dict((name, (problem_set, optimized))
+                            for name, _, _, problem_set, optimized in AUDIT_PATHS)
+    for name, legacy in [('street names', audit.audit_street_name),
+                         ('city names', audit.audit_city_name),
+                         ('zip codes', audit.audit_zipcode)]:
+        problem_set, optimized = optimized_audits.get(name, (None, None))
+        comparisons += compare_golden_auditing(name, golden['audit'][name], legacy,
+                                               problem_set, optimized)
+    return comparisons
+
+def diff_reports(expected, actual):
+    """
+    Compare two audit reports (see audit.get_audit_result).
+    Returns:
+        list of (problem set and category, missing problems, unexpected problems)
+    """
+    diffs = []
+    for name in sorted(set(expected) | set(actual)):
+        e = expected.get(name, {})
+        a = actual.get(name, {})
+        for category in sorted(set(e) | set(a)):
+            missing = e.get(category, set()) - a.get(category, set())
+            unexpected = a.get(category, set()) - e.get(category, set())
+            if missing or unexpected:
+                diffs.append((name + ' ' + category, sorted(missing), sorted(unexpected)))
+    return diffs
+
+def compare_file_reports(command, osm_files, jobs=None, region_name=funcvar.REGION):
+    """
+    Audit or clean osm files one by one in this process and concurrently with
+    the cli, and compare the merged reports.
+    Args:
+        command: audit or clean
+        osm_files: list of osm files
+        jobs: number of worker processes of the cli
+        region_name: region profile, used in this process and by the cli
+    Returns:
+        comparison in a dictionary, including the differences and the throughput
+    """
+    legacy = audit.audit_file if command == 'audit' else clean.clean_file
+    funcvar.use_region(region_name)
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = cli.merge_problems([legacy(f) for f in osm_files])
+    legacy_time = time.time() - start
+    start = time.time()
+    with tempfile.TemporaryDirectory() as output_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = cli.run(command, osm_files, output_dir, jobs, region_name)
+    optimized_time = time.time() - start
+    diffs = diff_reports(expected, summary['result'])
+    diffs += [(osm_file, error, '') for osm_file, error in sorted(summary['errors'].items())]
+    return {'name': command + ' files with cli',
+            'count': len(osm_files),
+            'diffs': diffs,
+            'legacy_rate': get_rate(len(osm_files), legacy_time),
+            'optimized_rate': get_rate(len(osm_files), optimized_time)}
+
+def compare_region_loading(name):
+    """
+    Compare the region profile loaded by region.load_region with the profile
+    compiled from scratch.
+    Args:
+        name: name or path of the region profile
+    Returns:
+        comparison in a dictionary, including the differences
+    """
+    with open(region.get_region_path(name), 'rb') as f:
+        content = f.read()
+    start = time.time()
+    expected = region.compile_region(json.loads(content.decode('utf-8')))
+    legacy_time = time.time() - start
+    start = time.time()
+    # Load the profile again instead of using the profile loaded in this process
+    region.clear_loaded()
+    actual = region.load_region(name)
+    optimized_time = time.time() - start
+    diffs = [(field, getattr(expected, field), getattr(actual, field))
+             for field in region.Region._fields
+             if field != 'content_hash' and getattr(expected, field) != getattr(actual, field)]
+    return {'name': 'region profile ' + name,
+            'count': 1,
+            'diffs': diffs,
+            'legacy_rate': get_rate(1, legacy_time),
+            'optimized_rate': get_rate(1, optimized_time)}
+
+
+#               Golden Outputs
+
+def write_golden(path, osm_files, fuzz, seed, baseline_dir, region_name=funcvar.REGION):
+    """
+    Write the golden outputs of the original code: the cleaned values and the
+    problems of the values of osm files and of generated street names, city
+    names, and zip codes, and the problems of their cleaned values.
+    Args:
+        path: json file of the golden outputs
+        osm_files: list of osm files
+        fuzz: number of generated street names
+        seed: seed of the random generator
+        baseline_dir: checkout of the original code, with its own clean.py,
+            audit.py, and funcvar.py
+        region_name: region profile that has the rules of the original code
+    """
+    values = get_osm_values(osm_files)
+    values['street names'] += [s for s, _ in generate_street_names(fuzz, seed)]
+    values['city names'] += generate_city_names(fuzz, seed)
+    values['zip codes'] += generate_zipcodes(fuzz, seed)
+    values = dict((name, list(dict.fromkeys(v))) for name, v in values.items())
+    process = subprocess.run([sys.executable, '-c', BASELINE_SCRIPT, json.dumps(BASELINE_FUNCTIONS)],
+                             cwd=baseline_dir, input=json.dumps(values), capture_output=True,
+                             text=True, encoding='utf-8')
+    if process.returncode != 0:
+        raise RuntimeError('the original code failed in ' + baseline_dir + ':\n' + process.stderr)
+    golden = {'region': region.load_region(region_name).name,
+              'fuzz': fuzz,
+              'seed': seed}
+    golden.update(json.loads(process.stdout))
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    # One value per line, so that a change of the golden outputs reads as a diff
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        for key in ('region', 'fuzz', 'seed'):
+            f.write(json.dumps(key) + ': ' + json.dumps(golden[key]) + ',\n')
+        for i, kind in enumerate(('clean', 'audit')):
+            f.write(json.dumps(kind) + ': {\n')
+            for j, name in enumerate(sorted(golden[kind])):
+                f.write(json.dumps(name) + ': [\n')
+                f.write(',\n'.join(json.dumps(entry, ensure_ascii=False) for entry in golden[kind][name]))
+                f.write('\n]' + (',' if j < len(golden[kind]) - 1 else '') + '\n')
+            f.write('}' + (',' if i == 0 else '') + '\n')
+        f.write('}\n')
+
+def load_golden(path):
+    """
+    Load the golden outputs of the original code (see write_golden).
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+#               Main Functions
+
+def get_osm_values(osm_files):
+    """
+    Get the street names, city names, and zip codes of osm files.
+    Returns:
+        dictionary of value names and their list of values
+    """
+    values = {'street names': [], 'city names': [], 'zip codes': []}
+    for osm_file in osm_files:
+        for elem in funcvar.get_element(osm_file):
+            for tag in elem.iter('tag'):
+                if funcvar.is_street_name(tag):
+                    values['street names'].append(tag.attrib['v'])
+                elif funcvar.is_city_name(tag):
+                    values['city names'].append(tag.attrib['v'])
+                elif funcvar.is_zipcode(tag):
+                    values['zip codes'].append(tag.attrib['v'])
+    return values
+
+def compare(osm_files, fuzz=10000, seed=0, jobs=None, region_name=funcvar.REGION,
+            golden_path=GOLDEN_PATH):
+    """
+    Compare the legacy functions with the optimized paths, and both with the
+    golden outputs of the original code.
+    Args:
+        osm_files: list of osm files
+        fuzz: number of generated street names
+        seed: seed of the random generator
+        jobs: number of worker processes of the cli
+        region_name: region profile
+        golden_path: json file of the golden outputs, not compared if None
+    Returns:
+        list of comparisons
+    """
+    funcvar.use_region(region_name)
+    comparisons = [compare_region_loading(region_name)]
+    values = get_osm_values(osm_files)
+    for name, legacy, optimized in CLEAN_PATHS:
+        comparisons.append(compare_cleaning(name, legacy, optimized, values[name]))
+    for name, cleaning, legacy, problem_set, optimized in AUDIT_PATHS:
+        comparisons.append(compare_auditing(name, legacy, problem_set, optimized, values[name]))
+        # Audit the cleaned values as well, as clean.py does
+        cleaned = [v for v in map(cleaning, values[name]) if v]
+        comparisons.append(compare_auditing('cleaned ' + name, legacy, problem_set, optimized, cleaned))
+    if golden_path is not None:
+        golden = load_golden(golden_path)
+        if golden['region'] == funcvar.REGION_NAME:
+            comparisons += compare_golden(golden)
+        else:
+            print ("Golden outputs of " + golden['region'] + " not compared in region "
+                   + funcvar.REGION_NAME)
+    if fuzz:
+        comparisons.append(compare_street_fuzz(fuzz, seed))
+    if osm_files:
+        for command in ('audit', 'clean'):
+            comparisons.append(compare_file_reports(command, osm_files, jobs, region_name))
+    return comparisons
+
+def display_comparisons(comparisons):
+    """
+    Display the differences and the throughput of the comparisons.
+    """
+    for c in comparisons:
+        status = 'OK' if not c['diffs'] else str(len(c['diffs'])) + ' differences'
+        print (c['name'] + ": " + str(c['count']) + " values, " + status)
+        print ("    " + ", ".join(path + ": " + str(c[path + '_rate']) + "/s"
+                                  for path in ('legacy', 'optimized') if path + '_rate' in c))
+        for diff in c['diffs'][:MAX_DIFFS]:
+            print ("    " + " | ".join(repr(x) for x in diff))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=[],
+                        help='osm files or directories of osm files')
+    parser.add_argument('--fuzz', type=int, default=10000,
+                        help='number of generated street names (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the street name generator (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes of the cli (default: all processors)')
+    parser.add_argument('-r', '--region', default=funcvar.REGION,
+                        help='region profile name or path (default: %(default)s)')
+    parser.add_argument('--golden', default=GOLDEN_PATH,
+                        help='json file of the golden outputs of the original code (default: %(default)s)')
+    parser.add_argument('--no-golden', action='store_true',
+                        help='do not compare with the golden outputs')
+    parser.add_argument('--write-golden', action='store_true',
+                        help='write the golden outputs of the osm files and generated street names '
+                        'with the original code of --baseline-dir')
+    parser.add_argument('--baseline-dir',
+                        help='checkout of the original code used to write the golden outputs')
+    args = parser.parse_args(argv)
+    osm_files = cli.get_osm_files(args.paths)
+    if args.write_golden:
+        if args.baseline_dir is None:
+            parser.error('--write-golden requires --baseline-dir')
+        write_golden(args.golden, osm_files, args.fuzz, args.seed, args.baseline_dir, args.region)
+        print ("Golden outputs written to " + args.golden)
+        return 0
+    comparisons = compare(osm_files, args.fuzz, args.seed, args.jobs, args.region,
+                          None if args.no_golden else args.golden)
+    display_comparisons(comparisons)
+    return 1 if any(c['diffs'] for c in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Export the cleaned nodes, ways, and relations of an osm file into the csv files
+listed in funcvar. The column order of the csv files follows the sql table schema
+so that the csv files can be imported into the database.
+
+Tags can be exported with their key and type as strings (plain), or dictionary-
+encoded (dict): the tag csvs then store the ids of the key and type, and the keys
+and types are written once in the tag keys and tag types csvs. A few hundred keys
+and types make up nearly all the tags, so the encoded tag csvs are much smaller.
+"""
+
+import csv
+import os
+import time
+import funcvar
+import clean
+
+DEFAULT_TAG_TYPE = 'regular'
+# Tag encodings
+PLAIN_TAGS = 'plain'
+DICT_TAGS = 'dict'
+TAG_ENCODINGS = (PLAIN_TAGS, DICT_TAGS)
+
+# Fields of the csv files, in the same order as funcvar.csv_files
+CSV_FIELDS = {funcvar.NODES_PATH: funcvar.NODE_FIELDS,
+              funcvar.NODE_TAGS_PATH: funcvar.NODE_TAGS_FIELDS,
+              funcvar.RELATIONS_PATH: funcvar.RELATION_FIELDS,
+              funcvar.RELATION_NODES_PATH: funcvar.RELATION_NODES_FIELDS,
+              funcvar.RELATION_RELATIONS_PATH: funcvar.RELATION_RELATIONS_FIELDS,
+              funcvar.RELATION_TAGS_PATH: funcvar.RELATION_TAGS_FIELDS,
+              funcvar.RELATION_WAYS_PATH: funcvar.RELATION_WAYS_FIELDS,
+              funcvar.WAYS_PATH: funcvar.WAY_FIELDS,
+              funcvar.WAY_NODES_PATH: funcvar.WAY_NODES_FIELDS,
+              funcvar.WAY_TAGS_PATH: funcvar.WAY_TAGS_FIELDS}
+
+
+#               Shaping Functions
+
+def clean_tag_value(tag):
+    """
+    Clean the value of a street name, city name, or zip code tag.
+    Args:
+        tag: tag element
+    Returns:
+        cleaned value, or None if the value could not be cleaned
+    """
+    v = tag.attrib['v']
+    if funcvar.is_street_name(tag):
+        return clean.clean_street_name(v)
+    if funcvar.is_city_name(tag):
+        return clean.clean_city_name(v)
+    if funcvar.is_zipcode(tag):
+        return clean.clean_zipcode(v)
+    return v
+
+def shape_tags(elem):
+    """
+    Shape the child tags of an element. Tags with problem characters in the key
+    and tags with values that could not be cleaned or that are cleaned into an
+    empty value (e.g. addr:city Texas) are dropped. (e.g. addr:street becomes
+    key street and type addr, name becomes key name and type regular)
+    Args:
+        elem: node, way, or relation element
+    Returns:
+        list of tag dictionaries
+    """
+    tags = []
+    for tag in elem.iter('tag'):
+        k = tag.attrib['k']
+        if funcvar.PROBLEMCHARS.search(k):
+            continue
+        value = clean_tag_value(tag)
+        if value is None or value == '':
+            continue
+        if funcvar.LOWER_COLON.match(k):
+            tag_type, key = k.split(':', 1)
+        else:
+            tag_type, key = DEFAULT_TAG_TYPE, k
+        tags.append({'id': elem.attrib['id'],
+                     'key': key,
+                     'value': value,
+                     'type': tag_type})
+    return tags
+
+def shape_element(elem):
+    """
+    Shape a node, way, or relation element into the rows of the csv files.
+    Args:
+        elem: node, way, or relation element
+    Returns:
+        dictionary of csv file paths and their rows
+    """
+    rows = {}
+    i = elem.attrib['id']
+    if elem.tag == 'node':
+        rows[funcvar.NODES_PATH] = [dict((f, elem.attrib.get(f)) for f in funcvar.NODE_FIELDS)]
+        rows[funcvar.NODE_TAGS_PATH] = shape_tags(elem)
+    elif elem.tag == 'way':
+        rows[funcvar.WAYS_PATH] = [dict((f, elem.attrib.get(f)) for f in funcvar.WAY_FIELDS)]
+        rows[funcvar.WAY_NODES_PATH] = [{'id': i, 'node_id': nd.attrib['ref'], 'position': position}
+                                        for position, nd in enumerate(elem.iter('nd'))]
+        rows[funcvar.WAY_TAGS_PATH] = shape_tags(elem)
+    elif elem.tag == 'relation':
+        rows[funcvar.RELATIONS_PATH] = [dict((f, elem.attrib.get(f)) for f in funcvar.RELATION_FIELDS)]
+        members = {'node': (funcvar.RELATION_NODES_PATH, 'node_id'),
+                   'way': (funcvar.RELATION_WAYS_PATH, 'way_id'),
+                   'relation': (funcvar.RELATION_RELATIONS_PATH, 'relation_id')}
+        for path, _ in members.values():
+            rows[path] = []
+        for position, member in enumerate(elem.iter('member')):
+            if member.attrib['type'] not in members:
+                continue
+            path, ref_field = members[member.attrib['type']]
+            rows[path].append({'id': i,
+                               ref_field: member.attrib['ref'],
+                               'position': position,
+                               'role': member.attrib.get('role')})
+        rows[funcvar.RELATION_TAGS_PATH] = shape_tags(elem)
+    return rows
+
+
+#               Exporting Functions
+
+def encode_tags(tags, keys, types):
+    """
+    Dictionary-encode tags, new keys and types get the next id.
+    Args:
+        tags: list of tag dictionaries
+        keys: dictionary of tag keys and their ids
+        types: dictionary of tag types and their ids
+    Returns:
+        list of encoded tag dictionaries
+    """
+    encoded = []
+    for tag in tags:
+        key_id = keys.setdefault(tag['key'], len(keys) + 1)
+        type_id = types.setdefault(tag['type'], len(types) + 1)
+        encoded.append({'id': tag['id'],
+                        'key_id': key_id,
+                        'value': tag['value'],
+                        'type_id': type_id})
+    return encoded
+
+def write_dictionary(path, fields, ids):
+    """
+    Write the tag keys or tag types of dictionary-encoded tags into a csv file.
+    Args:
+        path: csv file
+        fields: fields of the csv file, the id and the key or type
+        ids: dictionary of tag keys or tag types and their ids
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows((i, v) for v, i in sorted(ids.items(), key=lambda x: x[1]))
+
+def export_file(osm_file, output_dir='.', tag_encoding=PLAIN_TAGS):
+    """
+    Clean and export an osm file into the csv files.
+    Args:
+        osm_file
+        output_dir: directory of the csv files
+        tag_encoding: plain, or dict to dictionary-encode the tags
+    Returns:
+        the count of rows written into each csv file in a dictionary
+    """
+    if tag_encoding not in TAG_ENCODINGS:
+        raise ValueError('unknown tag encoding: ' + repr(tag_encoding))
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    print ("Exporting " + osm_file + " into " + output_dir)
+    fields = dict(CSV_FIELDS)
+    if tag_encoding == DICT_TAGS:
+        for path in funcvar.tag_csv_files:
+            fields[path] = funcvar.ENCODED_TAGS_FIELDS
+    keys = {}
+    types = {}
+    files = dict((path, open(os.path.join(output_dir, path), 'w', newline='', encoding='utf-8'))
+                 for path in funcvar.csv_files)
+    try:
+        writers = {}
+        for path in funcvar.csv_files:
+            writers[path] = csv.DictWriter(files[path], fields[path])
+            writers[path].writeheader()
+        counts = dict((path, 0) for path in funcvar.csv_files)
+        for elem in funcvar.get_element(osm_file):
+            for path, rows in shape_element(elem).items():
+                if tag_encoding == DICT_TAGS and path in funcvar.tag_csv_files:
+                    rows = encode_tags(rows, keys, types)
+                writers[path].writerows(rows)
+                counts[path] += len(rows)
+    finally:
+        for f in files.values():
+            f.close()
+    if tag_encoding == DICT_TAGS:
+        write_dictionary(os.path.join(output_dir, funcvar.TAG_KEYS_PATH),
+                         funcvar.TAG_KEYS_FIELDS, keys)
+        write_dictionary(os.path.join(output_dir, funcvar.TAG_TYPES_PATH),
+                         funcvar.TAG_TYPES_FIELDS, types)
+        counts[funcvar.TAG_KEYS_PATH] = len(keys)
+        counts[funcvar.TAG_TYPES_PATH] = len(types)
+    else:
+        # Remove the dictionary of an earlier dictionary-encoded export
+        for path in (funcvar.TAG_KEYS_PATH, funcvar.TAG_TYPES_PATH):
+            if os.path.isfile(os.path.join(output_dir, path)):
+                os.remove(os.path.join(output_dir, path))
+    return counts
+
+def exporting(osm_file=funcvar.OSM_PATH):
+    """
+    Export the osm file into the csv files, display the number of rows and the time
+    it takes to export the file
+    """
+    start = time.time()
+    counts = export_file(osm_file)
+    end = time.time()
+    for path in funcvar.csv_files:
+        print (path + ": " + str(counts[path]) + " rows")
+    print ("Time elapsed: " + str(end - start) + " seconds")
+
+
+if __name__ == "__main__":
+    exporting()
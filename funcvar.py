@@ -3,6 +3,7 @@
 import xml.etree.cElementTree as ET
 import os
 import re
+import region
 
 
 """
@@ -57,7 +58,7 @@ def get_map_bounds(osm_file):
         minimum and maximum latitude and minimum and maximum longitude in a dictionary
     """
     boundaries = None
-    for event, elem in ET.iterparse(OSM_PATH):
+    for event, elem in ET.iterparse(osm_file):
         if elem.tag == "bounds":
             boundaries= {'Latitude': [elem.attrib['minlat'], elem.attrib['maxlat']], 
                          'Longitude': [elem.attrib['minlon'], elem.attrib['maxlon']]}            
@@ -84,6 +85,8 @@ expected values used in th Open Street Data Wrangling project
 
 #          Files Paths                
 
+# The region profile (see region.py), e.g. burleson for regions/burleson.json
+REGION = 'burleson'
 # The osm file
 OSM_PATH = 'burlesonsample.osm'
 # The database file
@@ -102,6 +105,10 @@ WAY_TAGS_PATH = 'ways_tags.csv'
 csv_files = [NODES_PATH, NODE_TAGS_PATH, RELATIONS_PATH, RELATION_NODES_PATH,
              RELATION_RELATIONS_PATH, RELATION_TAGS_PATH,RELATION_WAYS_PATH,
              WAYS_PATH, WAY_NODES_PATH, WAY_TAGS_PATH]
+# The csv files of the tag keys and tag types of dictionary-encoded tags
+TAG_KEYS_PATH = 'tag_keys.csv'
+TAG_TYPES_PATH = 'tag_types.csv'
+tag_csv_files = [NODE_TAGS_PATH, RELATION_TAGS_PATH, WAY_TAGS_PATH]
 
 # The fields order in the csvs base on the column order in the sql table schema
 NODE_FIELDS = ['id', 'lat', 'lon', 'user', 'uid', 'version', 'changeset', 'timestamp']
@@ -114,6 +121,11 @@ RELATION_WAYS_FIELDS = ['id', 'way_id', 'position', 'role']
 WAY_FIELDS = ['id', 'user', 'uid', 'version', 'changeset', 'timestamp']
 WAY_NODES_FIELDS = ['id', 'node_id', 'position']
 WAY_TAGS_FIELDS = ['id', 'key', 'value', 'type']
+# The fields of dictionary-encoded tags, key_id and type_id are the ids of the
+# tag key and tag type in the tag keys and tag types csvs
+ENCODED_TAGS_FIELDS = ['id', 'key_id', 'value', 'type_id']
+TAG_KEYS_FIELDS = ['id', 'key']
+TAG_TYPES_FIELDS = ['id', 'type']
 
 
 #           Regular Expressions                   
@@ -130,7 +142,6 @@ PROBLEMCHARS = re.compile(r'[=\+/&<>;\'"\?%#$@\,\. \t\r\n]')
 ##start_point_re = re.compile(r'^([SWNE]|SE|SW|NW|NE)(\.|\s)', re.IGNORECASE)
 starting_word_re = re.compile(r'^\b\S+\.?', re.IGNORECASE)
 street_number_re = re.compile(r'^\d+\w?\s',re.IGNORECASE)
-zip_re = re.compile(r'7[5-6]\d{3}') # Regex to find Dallas Zipcodes
 
 
 #       Expected Values               
@@ -189,71 +200,6 @@ EXPECTED_STREET_TYPES = ['Alley',
 
 #          Value Mappings             
 
-CITY_MAPPING = {'Burleson': 'Crowley',
-                'Dfw': 'Fort Worth',
-                'Ft': 'Fort',
-                'Joshua': 'Alvarado'}
-
-CR_road = 'County Road'
-FM_road = 'FM Road'
-Inter_road = 'Interstate Highway' 
-TX_road = 'TX Highway'
-US_road = 'US Highway'
-
-HIGHWAY_MAPPING = {'1043': CR_road,
-                   '1138': FM_road,
-                   '114': TX_road,
-                   '1187': FM_road,
-                   '12': TX_road + ' Loop',
-                   '121': TX_road,
-                   '1382': FM_road,
-                   '1565': FM_road,
-                   '157': FM_road,
-                   '1603': FM_road,
-                   '161': TX_road,
-                   '175': US_road,
-                   '183': TX_road,
-                   '1902': FM_road,
-                   '199': TX_road,                   
-                   '20': Inter_road,
-                   '206': CR_road,
-                   '2181': FM_road,
-                   '23': CR_road,
-                   '234': CR_road,
-                   '26': TX_road,
-                   '287': US_road,
-                   '288': TX_road + ' Loop',
-                   '30': Inter_road,
-                   '3040': FM_road,
-                   '34': TX_road,
-                   '342': TX_road,
-                   '35': Inter_road,
-                   '356': TX_road,
-                   '360': TX_road,
-                   '376': CR_road,
-                   '377': US_road,
-                   '380': US_road,
-                   '407': FM_road,
-                   '408': TX_road + ' Spur',
-                   '423': FM_road,
-                   '45': Inter_road,
-                   '526': CR_road,
-                   '549': CR_road,
-                   '544': FM_road,
-                   '615': CR_road,
-                   '664': FM_road,
-                   '66': TX_road,
-                   '67': US_road,
-                   '707': CR_road,
-                   '730': FM_road,
-                   '741': FM_road,
-                   '77': US_road,
-                   '78': TX_road,
-                   '80': US_road,
-                   '81': US_road,
-                   '820': TX_road + ' Loop',
-                   '983': FM_road}
-
 POINT_MAPPING = {'s': 'South',
                  'se': 'Southeast',
                  'e': 'East',
@@ -282,4 +228,26 @@ TYPE_MAPPING = {'56th': '56th Street',
                 'pkwy': 'Parkway',
                 'rd': 'Road',
                 'st': 'Street',
-                'pkwy': 'Parkway'}
\ No newline at end of file
+                'pkwy': 'Parkway'}
+
+
+#          Region Rules               
+
+def use_region(name):
+    """
+    Use the rules of a region profile to audit and clean osm files. The zip code 
+    regex, zip code prefixes, city mapping, and highway mapping come from the 
+    compiled profile.
+    Args:
+        name: name of a profile in the regions directory or path of a profile
+    """
+    global REGION_NAME, zip_re, ZIP_PREFIXES, CITY_MAPPING, CITY_INDEX, HIGHWAY_MAPPING
+    compiled = region.load_region(name)
+    REGION_NAME = compiled.name
+    zip_re = compiled.zip_re
+    ZIP_PREFIXES = compiled.zip_prefixes
+    CITY_MAPPING = compiled.city_mapping
+    CITY_INDEX = compiled.city_index
+    HIGHWAY_MAPPING = compiled.highway_mapping
+
+use_region(REGION)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Region profiles consist of the region specific rules used to audit and clean an
+osm file: the zip code regular expression and prefixes, the city name mapping,
+and the highway mapping. A profile is a json file in the regions directory
+(see regions/burleson.json).
+
+A profile is compiled into lookup tables, regular expressions, and matcher
+indexes. Compiling a profile is cheap, so it is done once per process and the
+compiled profile is kept in memory keyed by the hash of the profile content;
+editing a profile gives a new hash, so the edited profile is compiled again.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+
+REGION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions')
+
+Region = namedtuple('Region', ['name',
+                               'description',
+                               'zip_re',
+                               'zip_prefixes',
+                               'city_mapping',
+                               'city_index',
+                               'highway_mapping',
+                               'content_hash'])
+
+# Compiled profiles already loaded in this process, by content hash
+_loaded = {}
+
+
+def get_region_path(region):
+    """
+    Get the path of a region profile.
+    Args:
+        region: path of a profile, or name of a profile in the regions directory
+    Returns:
+        path of the profile
+    """
+    if os.path.isfile(region):
+        return region
+    return os.path.join(REGION_DIR, region.lower() + '.json')
+
+def get_region_names():
+    """
+    Get the names of the region profiles in the regions directory.
+    """
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(REGION_DIR)
+                  if name.endswith('.json'))
+
+def compile_region(profile, content_hash=None):
+    """
+    Compile a region profile into lookup tables, regular expressions, and
+    matcher indexes.
+    Args:
+        profile: region profile in a dictionary
+        content_hash: hash of the profile content
+    Returns:
+        compiled region profile
+    """
+    city_mapping = dict(profile.get('city_mapping', {}))
+    # Lowercase city names to match, in the order of the mapping
+    city_index = tuple((k.lower(), k, v) for k, v in city_mapping.items())
+    return Region(name=profile['name'],
+                  description=profile.get('description', ''),
+                  zip_re=re.compile(profile['zip_pattern']),
+                  zip_prefixes=tuple(profile['zip_prefixes']),
+                  city_mapping=city_mapping,
+                  city_index=city_index,
+                  highway_mapping=dict(profile.get('highway_mapping', {})),
+                  content_hash=content_hash)
+
+def load_region(region):
+    """
+    Load a compiled region profile. The profile is compiled again only when its
+    content has changed since it was last loaded in this process.
+    Args:
+        region: path of a profile, or name of a profile in the regions directory
+    Returns:
+        compiled region profile
+    """
+    path = get_region_path(region)
+    with open(path, 'rb') as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    if content_hash not in _loaded:
+        _loaded[content_hash] = compile_region(json.loads(content.decode('utf-8')), content_hash)
+    return _loaded[content_hash]
+
+def clear_loaded():
+    """
+    Forget the compiled profiles loaded in this process, so that the next
+    load_region compiles its profile again.
+    """
+    _loaded.clear()
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Long-lived cleaning service. The service loads the region rules once and keeps
+memoization caches of the cleaned and audited values warm, so that short-lived
+jobs can clean and audit street names, city names, and zip codes in batches
+without importing the cleaning code (see client.py).
+
+The service listens on a Unix socket, or on localhost TCP when a port is given.
+Clean and audit requests are processed one at a time by a single worker thread,
+since the audit functions use the problem sets of audit.py, so a large batch
+delays the batches of the other clients. The event loop keeps reading requests
+meanwhile and answers ping and stats requests at once. Every response includes
+the latency of the request since it was received, the part of it spent waiting
+for the worker thread (queued_ms), and the cache metrics.
+
+Examples:
+    python service.py
+    python service.py --port 8765 --region burleson --warm burlesonsample.osm
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import socket
+import stat
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import funcvar
+import audit
+import clean
+import client
+
+# Maximum number of values in the caches of every function
+CACHE_SIZE = 200000
+# Maximum size of a request line, in bytes
+MAX_REQUEST_SIZE = 2 ** 26
+
+CLEAN_FUNCTIONS = {'street': clean.clean_street_name,
+                   'city': clean.clean_city_name,
+                   'zip': clean.clean_zipcode}
+AUDIT_FUNCTIONS = {'street': audit.audit_street_name,
+                   'city': audit.audit_city_name,
+                   'zip': audit.audit_zipcode}
+
+# Operations answered in the event loop instead of the worker thread
+INLINE_OPS = ('ping', 'stats')
+
+# Memoized functions by operation and field, created by use_region
+cached = {}
+started = time.time()
+# Worker thread of the clean and audit requests
+worker = ThreadPoolExecutor(max_workers=1)
+
+
+#               Cached Functions
+
+def audit_value(audit_function, v):
+    """
+    Audit one value.
+    Args:
+        audit_function: function of audit.py that audits one value
+        v: value
+    Returns:
+        list of the problems of the value as [problem set, category] pairs
+    """
+    audit.reset_audit_result()
+    audit_function(v)
+    return [[name, category]
+            for name, problems in sorted(audit.get_audit_result().items())
+            for category in sorted(problems)]
+
+def use_region(region):
+    """
+    Use the rules of a region profile, and start with empty caches since the
+    cached values depend on the rules.
+    Args:
+        region: name or path of the region profile
+    """
+    funcvar.use_region(region)
+    cached.clear()
+    for field, f in CLEAN_FUNCTIONS.items():
+        cached['clean', field] = functools.lru_cache(CACHE_SIZE)(f)
+    for field, f in AUDIT_FUNCTIONS.items():
+        cached['audit', field] = functools.lru_cache(CACHE_SIZE)(
+            functools.partial(audit_value, f))
+
+use_region(funcvar.REGION)
+
+def get_cache_metrics(functions=None):
+    """
+    Get the hits, misses, and size of the caches.
+    Args:
+        functions: list of (operation, field), all the caches if None
+    Returns:
+        cache metrics in a dictionary
+    """
+    metrics = {'hits': 0, 'misses': 0, 'size': 0}
+    for key in (functions or sorted(cached)):
+        info = cached[key].cache_info()
+        metrics['hits'] += info.hits
+        metrics['misses'] += info.misses
+        metrics['size'] += info.currsize
+    return metrics
+
+def warm(osm_files):
+    """
+    Clean and audit the street names, city names, and zip codes of osm files to
+    fill the caches.
+    """
+    for osm_file in osm_files:
+        print ("Warming the caches with " + osm_file)
+        for elem in funcvar.get_element(osm_file):
+            for tag in elem.iter("tag"):
+                if funcvar.is_street_name(tag):
+                    field = 'street'
+                elif funcvar.is_city_name(tag):
+                    field = 'city'
+                elif funcvar.is_zipcode(tag):
+                    field = 'zip'
+                else:
+                    continue
+                cached['audit', field](tag.attrib['v'])
+                v = cached['clean', field](tag.attrib['v'])
+                if v:
+                    cached['audit', field](v)
+
+
+#               Request Handling
+
+def process(message, received=None):
+    """
+    Process a request.
+    Args:
+        message: request in a dictionary (see client.py)
+        received: time the request was received, now if None
+    Returns:
+        response in a dictionary
+    """
+    start = time.time()
+    if received is None:
+        received = start
+    if not isinstance(message, dict):
+        raise ValueError('request must be a json object')
+    op = message.get('op')
+    response = {'id': message.get('id'), 'ok': True}
+    if op in ('clean', 'audit'):
+        field = message.get('field')
+        if field not in client.FIELDS:
+            raise ValueError('unknown field: ' + repr(field))
+        values = message.get('values', [])
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError('values must be a list of strings')
+        f = cached[op, field]
+        before = get_cache_metrics([(op, field)])
+        response['results'] = [f(v) for v in values]
+        after = get_cache_metrics([(op, field)])
+        response['cache'] = {'hits': after['hits'] - before['hits'],
+                             'misses': after['misses'] - before['misses'],
+                             'size': after['size']}
+    elif op == 'stats':
+        response['region'] = funcvar.REGION_NAME
+        response['uptime'] = round(time.time() - started, 3)
+        response['cache'] = get_cache_metrics()
+    elif op != 'ping':
+        raise ValueError('unknown op: ' + repr(op))
+    response['queued_ms'] = round((start - received) * 1000, 3)
+    response['latency_ms'] = round((time.time() - received) * 1000, 3)
+    return response
+
+async def handle(reader, writer):
+    """
+    Answer the requests of a connection, one json object per line.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # The request is larger than MAX_REQUEST_SIZE
+                response = {'id': None, 'ok': False, 'error': 'request too large'}
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                break
+            if not line:
+                break
+            received = time.time()
+            message = None
+            try:
+                message = json.loads(line.decode('utf-8'))
+                if isinstance(message, dict) and message.get('op') in INLINE_OPS:
+                    response = process(message, received)
+                else:
+                    response = await loop.run_in_executor(worker, process, message, received)
+            except Exception as e:
+                message_id = message.get('id') if isinstance(message, dict) else None
+                response = {'id': message_id, 'ok': False, 'error': repr(e)}
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+def remove_stale_socket(path):
+    """
+    Remove the Unix socket of a service that is no longer running, so that the
+    service can listen on it again. Raises FileExistsError if the path is not a
+    socket or if a service is listening on it.
+    Args:
+        path: Unix socket of the service
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(path + ' exists and is not a socket')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+        return
+    finally:
+        sock.close()
+    raise FileExistsError('a service is already listening on ' + path)
+
+async def serve(path=client.SOCKET_PATH, host='127.0.0.1', port=None):
+    """
+    Serve requests until the service is stopped.
+    Args:
+        path: Unix socket of the service
+        host: host of the service when a port is given
+        port: TCP port of the service
+    """
+    if port is None:
+        remove_stale_socket(path)
+        server = await asyncio.start_unix_server(handle, path, limit=MAX_REQUEST_SIZE)
+        print ("Serving on " + path)
+    else:
+        server = await asyncio.start_server(handle, host, port, limit=MAX_REQUEST_SIZE)
+        print ("Serving on " + host + ":" + str(port))
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=client.SOCKET_PATH,
+                        help='Unix socket of the service (default: %(default)s)')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='host of the service when a port is given (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=None,
+                        help='TCP port of the service instead of the Unix socket')
+    parser.add_argument('-r', '--region', default=funcvar.REGION,
+                        help='region profile name or path (default: %(default)s)')
+    parser.add_argument('--warm', nargs='*', default=[],
+                        help='osm files used to fill the caches at start')
+    args = parser.parse_args(argv)
+    use_region(args.region)
+    warm(args.warm)
+    try:
+        asyncio.run(serve(args.socket, args.host, args.port))
+    except FileExistsError as e:
+        print ("Cannot serve on " + args.socket + ": " + str(e))
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
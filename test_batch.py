@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the batch functions: every batch function must give the same results
+as the scalar function applied to every value, for every kind of container.
+
+Example:
+    python -m pytest test_batch.py
+"""
+
+import random
+import unittest
+import audit
+import clean
+import batch
+
+np = batch.np
+pd = batch.pd
+
+VALUES = ['76028', '76028-1234', 'TX 76097', '7602', '', '75001', '٧٦٠٢٨', '７６０２８',
+          'Burleson', 'Burleson, TX', 'Ft. Worth', 'Fort Worth', 'Joshua', 'Dfw', 'Texas',
+          'W Bufford St', 'S Hurst Rd.', 'I-35W', 'FM 1187', '7604 Dobson Street Suite 201']
+
+# Batch functions and the scalar functions they must agree with
+CLEAN_FUNCTIONS = [(batch.clean_street_names, clean.clean_street_name),
+                   (batch.clean_city_names, clean.clean_city_name),
+                   (batch.clean_zipcodes, clean.clean_zipcode)]
+AUDIT_FUNCTIONS = [(batch.audit_city_names, audit.get_city_name_problems),
+                   (batch.audit_zipcodes, audit.get_zipcode_problems)]
+
+def is_na(v):
+    """Check whether a value of a container is missing"""
+    if v is None:
+        return True
+    return pd is not None and not isinstance(v, str) and bool(pd.isna(v))
+
+def get_values(distinct):
+    """
+    Get repeated values, or mostly distinct values, with missing values.
+    """
+    if distinct:
+        rng = random.Random(0)
+        values = [rng.choice(VALUES) + ' ' + str(i) for i in range(3000)]
+        values += ['76' + str(i).zfill(3) for i in range(1000)]
+    else:
+        values = VALUES * 200
+    return values[:5] + [None] + values[5:] + [None]
+
+def get_containers(values):
+    """
+    Get the values as a list, NumPy arrays, and pandas Series of every string dtype.
+    """
+    containers = [('list', values)]
+    if np is not None:
+        containers.append(('object array', np.array(values, dtype=object)))
+        containers.append(('<U array', np.array([v for v in values if v is not None])))
+    if pd is not None:
+        for dtype in (object, 'str', 'string'):
+            containers.append((str(dtype) + ' Series',
+                               pd.Series(values, dtype=dtype, index=range(7, 7 + len(values)))))
+    return containers
+
+
+class TestBatch(unittest.TestCase):
+
+    def check_container(self, result, container):
+        if pd is not None and isinstance(container, pd.Series):
+            self.assertIsInstance(result, pd.Series)
+            self.assertEqual(list(result.index), list(container.index))
+        elif np is not None and isinstance(container, np.ndarray):
+            self.assertIsInstance(result, np.ndarray)
+        else:
+            self.assertIsInstance(result, list)
+        self.assertEqual(len(result), len(container))
+
+    def check_cleaning(self, distinct):
+        for name, container in get_containers(get_values(distinct)):
+            for batch_function, f in CLEAN_FUNCTIONS:
+                with self.subTest(container=name, function=batch_function.__name__):
+                    result = batch_function(container)
+                    self.check_container(result, container)
+                    expected = [None if is_na(v) else f(v) for v in container]
+                    self.assertEqual([None if is_na(v) else v for v in result], expected)
+
+    def check_auditing(self, distinct):
+        for name, container in get_containers(get_values(distinct)):
+            for batch_function, get_problems in AUDIT_FUNCTIONS:
+                with self.subTest(container=name, function=batch_function.__name__):
+                    masks = batch_function(container)
+                    problems = [[] if is_na(v) else get_problems(v) for v in container]
+                    for category, mask in masks.items():
+                        self.check_container(mask, container)
+                        self.assertEqual([bool(m) for m in mask],
+                                         [category in p for p in problems])
+
+    def test_clean_repeated_values(self):
+        self.check_cleaning(distinct=False)
+
+    def test_clean_distinct_values(self):
+        self.check_cleaning(distinct=True)
+
+    def test_audit_repeated_values(self):
+        self.check_auditing(distinct=False)
+
+    def test_audit_distinct_values(self):
+        self.check_auditing(distinct=True)
+
+    def test_is_missing(self):
+        self.assertTrue(batch.is_missing(None))
+        self.assertTrue(batch.is_missing(float('nan')))
+        self.assertFalse(batch.is_missing(''))
+        self.assertFalse(batch.is_missing('76028'))
+        if pd is not None:
+            self.assertTrue(batch.is_missing(pd.NA))
+
+
+if __name__ == "__main__":
+    unittest.main()
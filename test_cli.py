@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the command-line entry point: report names, reports, and arguments.
+
+Example:
+    python -m pytest test_cli.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import funcvar
+import cli
+
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <bounds minlat="32.5" minlon="-97.4" maxlat="32.6" maxlon="-97.3"/>
+  <node id="1" lat="32.55" lon="-97.35" user="a" uid="1" version="1" changeset="1" timestamp="2016-01-01T00:00:00Z">
+    <tag k="addr:city" v="Texas"/>
+    <tag k="addr:postcode" v="7602"/>
+  </node>
+  <node id="2" lat="32.56" lon="-97.36" user="b" uid="2" version="1" changeset="1" timestamp="2016-01-01T00:00:00Z">
+    <tag k="addr:street" v="W Bufford St"/>
+  </node>
+</osm>
+"""
+
+
+class TestReportNames(unittest.TestCase):
+
+    def test_same_name_in_two_directories(self):
+        osm_files = [os.path.join('extracts', 'a', 'tarrant.osm'),
+                     os.path.join('extracts', 'b', 'tarrant.osm')]
+        self.assertEqual(cli.get_report_names(osm_files),
+                         {osm_files[0]: 'a.tarrant', osm_files[1]: 'b.tarrant'})
+
+    def test_summary_name_is_not_taken(self):
+        osm_files = [os.path.join('extracts', 'summary.osm'),
+                     os.path.join('extracts', 'summary.xml')]
+        self.assertEqual(cli.get_report_names(osm_files),
+                         {osm_files[0]: 'summary.2', osm_files[1]: 'summary.3'})
+
+
+class TestRun(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.osm_files = []
+        # A file named summary.osm does not overwrite the summary
+        for osm_dir, name in [('a', 'sample.osm'), ('b', 'sample.osm'), ('', 'summary.osm')]:
+            osm_dir = os.path.join(self.dir, 'extracts', osm_dir)
+            if not os.path.isdir(osm_dir):
+                os.makedirs(osm_dir)
+            osm_file = os.path.join(osm_dir, name)
+            with open(osm_file, 'w', encoding='utf-8') as f:
+                f.write(OSM)
+            self.osm_files.append(osm_file)
+        self.output_dir = os.path.join(self.dir, 'reports')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read_report(self, name):
+        with open(os.path.join(self.output_dir, name), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_one_report_per_file(self):
+        for command in cli.COMMANDS:
+            with self.subTest(command=command):
+                summary = cli.run(command, self.osm_files, self.output_dir, jobs=1)
+                self.assertEqual(summary['errors'], {})
+                self.assertEqual(summary['files'], self.osm_files)
+                names = ['a.sample.json', 'b.sample.json', 'summary.2.json']
+                self.assertEqual(summary['reports'], dict(zip(self.osm_files, names)))
+                for osm_file, name in zip(self.osm_files, names):
+                    self.assertEqual(self.read_report(name)['file'], osm_file)
+                self.assertEqual(self.read_report(cli.SUMMARY_NAME + '.json')['result'],
+                                 cli.to_json(summary['result']))
+
+    def test_merged_results(self):
+        summary = cli.run('stats', self.osm_files, self.output_dir, jobs=1)
+        self.assertEqual(summary['result']['elements'], {'node': 6, 'way': 0, 'relation': 0})
+        summary = cli.run('audit', self.osm_files, self.output_dir, jobs=1)
+        self.assertEqual(self.read_report('summary.json')['result']['problem_zipcodes'],
+                         {'non 5-digit': ['7602']})
+
+    def test_missing_files_are_errors(self):
+        osm_files = self.osm_files[:1] + [os.path.join(self.dir, 'missing.osm')]
+        summary = cli.run('stats', osm_files, self.output_dir, jobs=1)
+        self.assertEqual(summary['files'], osm_files[:1])
+        self.assertEqual(list(summary['errors']), osm_files[1:])
+
+
+class TestArguments(unittest.TestCase):
+
+    def test_jobs_must_be_positive(self):
+        parser = cli.get_parser()
+        self.assertEqual(parser.parse_args(['audit', '-j', '2']).jobs, 2)
+        for jobs in ['0', '-1', 'two']:
+            with self.subTest(jobs=jobs):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        parser.parse_args(['audit', '-j', jobs])
+
+    def test_default_paths(self):
+        self.assertEqual(cli.get_parser().parse_args(['stats']).paths, [funcvar.OSM_PATH])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of exporting osm files and loading them into the database.
+
+Example:
+    python -m pytest test_database.py
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+import funcvar
+import export
+import database
+import analytics
+
+OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <bounds minlat="32.5" minlon="-97.4" maxlat="32.6" maxlon="-97.3"/>
+  <node id="1" lat="32.55" lon="-97.35" user="a" uid="1" version="1" changeset="1" timestamp="2016-01-01T00:00:00Z">
+    <tag k="addr:city" v="Texas"/>
+    <tag k="addr:postcode" v="76028"/>
+    <tag k="amenity" v="school"/>
+  </node>
+  <node id="2" lat="32.56" lon="-97.36" user="b" uid="2" version="1" changeset="1" timestamp="2016-01-01T00:00:00Z">
+    <tag k="addr:city" v="TX"/>
+    <tag k="addr:city" v="Fort Worth"/>
+  </node>
+</osm>
+"""
+
+
+class TestLoadEmptyValues(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.osm_file = os.path.join(self.dir, 'sample.osm')
+        with open(self.osm_file, 'w', encoding='utf-8') as f:
+            f.write(OSM)
+        self.csv_dir = os.path.join(self.dir, 'csv')
+        self.db_path = os.path.join(self.dir, 'sample.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_cities_cleaned_into_empty_values_are_dropped(self):
+        export.export_file(self.osm_file, self.csv_dir)
+        with open(os.path.join(self.csv_dir, funcvar.NODE_TAGS_PATH), newline='', encoding='utf-8') as f:
+            values = [row['value'] for row in csv.DictReader(f)]
+        self.assertNotIn('', values)
+        conn = database.connect(self.db_path)
+        counts = database.load_csv_dir(conn, self.csv_dir)
+        self.assertEqual(counts['nodes'], 2)
+        self.assertEqual(analytics.top_cities(conn), [('Fort Worth', 1)])
+        self.assertEqual(analytics.top_postcodes(conn), [('76028', 1)])
+        conn.close()
+
+    def test_empty_values_are_loaded_as_null(self):
+        export.export_file(self.osm_file, self.csv_dir)
+        path = os.path.join(self.csv_dir, funcvar.NODE_TAGS_PATH)
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(['2', 'city', '', 'addr'])
+        for tag_encoding in export.TAG_ENCODINGS:
+            conn = database.connect(os.path.join(self.dir, tag_encoding + '.db'), tag_encoding)
+            # Loading twice replaces the tags with an empty value too
+            for _ in range(2):
+                database.load_csv_dir(conn, self.csv_dir)
+            self.assertEqual(analytics.top_cities(conn), [('Fort Worth', 1)])
+            self.assertEqual(analytics.count_tags(conn, 'addr'), 3)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM nodes_tags WHERE value IS NULL"
+                                          ).fetchone()[0], 1)
+            conn.close()
+
+
+class TestMissingSummaries(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.osm_file = os.path.join(self.dir, 'sample.osm')
+        with open(self.osm_file, 'w', encoding='utf-8') as f:
+            f.write(OSM)
+        self.csv_dir = os.path.join(self.dir, 'csv')
+        self.db_path = os.path.join(self.dir, 'sample.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_summaries_are_rebuilt_on_connect(self):
+        export.export_file(self.osm_file, self.csv_dir)
+        conn = database.connect(self.db_path)
+        database.load_csv_dir(conn, self.csv_dir)
+        for table in ['summary_keys'] + analytics.SUMMARY_TABLES:
+            conn.execute("DROP TABLE " + table)
+        conn.commit()
+        conn.close()
+        conn = database.connect(self.db_path)
+        # Loading again replaces the rows counted by the rebuilt summaries
+        for _ in range(2):
+            self.assertEqual(analytics.top_postcodes(conn), [('76028', 1)])
+            self.assertEqual(analytics.top_cities(conn), [('Fort Worth', 1)])
+            self.assertEqual(analytics.count_elements(conn)['node'], 2)
+            database.load_csv_dir(conn, self.csv_dir)
+        conn.close()
+
+
+class TestLoadTagEncodings(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.osm_file = os.path.join(self.dir, 'sample.osm')
+        with open(self.osm_file, 'w', encoding='utf-8') as f:
+            f.write(OSM)
+        self.csv_dir = os.path.join(self.dir, 'csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_plain_export_after_dict_export(self):
+        export.export_file(self.osm_file, self.csv_dir, export.DICT_TAGS)
+        export.export_file(self.osm_file, self.csv_dir, export.PLAIN_TAGS)
+        self.assertFalse(os.path.exists(os.path.join(self.csv_dir, funcvar.TAG_KEYS_PATH)))
+        self.assertFalse(os.path.exists(os.path.join(self.csv_dir, funcvar.TAG_TYPES_PATH)))
+        conn = database.connect(os.path.join(self.dir, 'sample.db'))
+        database.load_csv_dir(conn, self.csv_dir)
+        self.assertEqual(analytics.top_cities(conn), [('Fort Worth', 1)])
+        conn.close()
+
+    def test_tag_encoding_is_read_from_the_header(self):
+        dict_dir = os.path.join(self.dir, 'dict')
+        export.export_file(self.osm_file, dict_dir, export.DICT_TAGS)
+        export.export_file(self.osm_file, self.csv_dir, export.PLAIN_TAGS)
+        # A stale dictionary next to plain tags is ignored
+        shutil.copy(os.path.join(dict_dir, funcvar.TAG_KEYS_PATH), self.csv_dir)
+        shutil.copy(os.path.join(dict_dir, funcvar.TAG_TYPES_PATH), self.csv_dir)
+        for csv_dir in (dict_dir, self.csv_dir):
+            self.assertEqual(list(database.read_csv(csv_dir, 'nodes_tags')),
+                             [('1', 'postcode', '76028', 'addr'),
+                              ('1', 'amenity', 'school', 'regular'),
+                              ('2', 'city', 'Fort Worth', 'addr')])
+
+
+if __name__ == "__main__":
+    unittest.main()
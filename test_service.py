@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the cleaning service: the service is started on a temporary Unix socket
+and queried with the client.
+
+Example:
+    python -m pytest test_service.py
+"""
+
+import asyncio
+import json
+import os
+import select
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import audit
+import clean
+import client
+import service
+
+
+class TestService(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'service.sock')
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+        self.loop.close()
+        shutil.rmtree(self.dir)
+
+    async def stop(self):
+        """Cancel the service and its connections"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def start(self):
+        """Start the service in the event loop thread and wait until it listens"""
+        asyncio.run_coroutine_threadsafe(service.serve(self.path), self.loop)
+        for _ in range(500):
+            try:
+                return client.Client(self.path, timeout=30)
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.01)
+        self.fail('service did not start')
+
+    def test_clean_and_audit(self):
+        values = ['W Bufford St', 'S Hurst Rd.', 'I-35W']
+        with self.start() as c:
+            self.assertEqual(c.clean('street', values),
+                             [clean.clean_street_name(v) for v in values])
+            self.assertEqual(c.clean('zip', ['TX 76097', '7602']),
+                             [clean.clean_zipcode('TX 76097'), clean.clean_zipcode('7602')])
+            self.assertEqual(c.audit('zip', ['7602']),
+                             [service.audit_value(audit.audit_zipcode, '7602')])
+            self.assertIn(['problem_zipcodes', 'non 5-digit'], c.audit('zip', ['7602'])[0])
+            self.assertEqual(c.audit('zip', ['76028']), [[]])
+            # The second request is answered from the cache
+            self.assertEqual(c.last_response['cache']['hits'], 0)
+            c.audit('zip', ['76028'])
+            self.assertEqual(c.last_response['cache']['hits'], 1)
+            self.assertEqual(c.stats()['region'], service.funcvar.REGION_NAME)
+
+    def test_errors(self):
+        with self.start() as c:
+            for op, field, values in [('clean', 'country', ['a']),
+                                      ('audit', 'zip', [76028]),
+                                      ('delete', None, None)]:
+                with self.subTest(op=op, field=field):
+                    with self.assertRaises(client.ServiceError):
+                        c.request(op, field, values)
+            # The connection is still usable after an error
+            self.assertEqual(c.clean('city', ['Fort Worth']), ['Fort Worth'])
+            for line in [b'[1, 2]\n', b'not json\n',
+                         b'{"op": "clean", "field": "city", "values": "Fort Worth"}\n']:
+                with self.subTest(line=line):
+                    c.file.write(line)
+                    c.file.flush()
+                    response = json.loads(c.file.readline().decode('utf-8'))
+                    self.assertFalse(response['ok'])
+                    self.assertIsNone(response['id'])
+
+    def test_ping_during_large_batch(self):
+        values = [str(i) + ' Main St' for i in range(50000)]
+        with self.start() as c, client.Client(self.path, timeout=30) as batch:
+            batch.file.write(json.dumps({'id': 1, 'op': 'audit', 'field': 'street',
+                                         'values': values}).encode('utf-8') + b'\n')
+            batch.file.flush()
+            time.sleep(0.05)
+            self.assertTrue(c.request('ping')['ok'])
+            # The ping is answered before the batch
+            self.assertEqual(select.select([batch.sock], [], [], 0)[0], [])
+            response = json.loads(batch.file.readline().decode('utf-8'))
+            self.assertTrue(response['ok'])
+            self.assertEqual(len(response['results']), len(values))
+
+    def test_stale_socket_is_replaced(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.close()
+        with self.start() as c:
+            self.assertTrue(c.request('ping')['ok'])
+
+    def test_existing_paths_are_kept(self):
+        with open(self.path, 'w') as f:
+            f.write('data')
+        with self.assertRaises(FileExistsError):
+            service.remove_stale_socket(self.path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'data')
+        os.remove(self.path)
+        with self.start() as c:
+            with self.assertRaises(FileExistsError):
+                service.remove_stale_socket(self.path)
+            self.assertTrue(c.request('ping')['ok'])
+
+
+if __name__ == "__main__":
+    unittest.main()